@@ -0,0 +1,54 @@
+"""专辑封面代理 API 路由"""
+from typing import Literal
+
+from fastapi import APIRouter, Header
+
+from app.schemas.common import ApiResponse
+from app.schemas.cover import (
+    AlbumPaletteBatchRequest,
+    AlbumPaletteBatchResponse,
+    AlbumPaletteRequest,
+    AlbumPaletteResponse,
+    CoverPrefetchRequest,
+    CoverPrefetchResponse,
+)
+from app.schemas.response import cached_bytes_response, success
+from app.services import cover as services_cover
+from app.services import palette as services_palette
+
+router = APIRouter()
+
+
+@router.get("/album/{album_mid}")
+async def get_album_cover(
+    album_mid: str,
+    size: Literal["thumb", "300", "800"] = "300",
+    if_none_match: str | None = Header(default=None, alias="If-None-Match"),
+):
+    """获取专辑封面图片（thumb 150px / 300px / 800px），本地缓存优先，响应可长期缓存"""
+    cover = await services_cover.get_cover(album_mid, size)
+    return cached_bytes_response(cover.data, cover.media_type, cover.etag, if_none_match)
+
+
+@router.post("/prefetch", response_model=ApiResponse[CoverPrefetchResponse])
+async def prefetch_album_covers(req: CoverPrefetchRequest):
+    """后台预取歌单或指定专辑的封面到本地缓存"""
+    result = await services_cover.prefetch_album_covers(
+        req.albumMidList, playlist_id=req.playlistId, request_id=req.requestId
+    )
+    return success(data=result)
+
+
+@router.post("/palette", response_model=ApiResponse[AlbumPaletteResponse])
+async def get_album_palette(req: AlbumPaletteRequest):
+    """获取专辑配色（主色、鲜艳色、柔和色），本地缓存优先"""
+    return success(data=await services_palette.get_album_palette(req.albumMid))
+
+
+@router.post("/palette/batch", response_model=ApiResponse[AlbumPaletteBatchResponse])
+async def get_album_palettes(req: AlbumPaletteBatchRequest):
+    """批量获取歌单或指定专辑的配色，未缓存的即时计算"""
+    result = await services_palette.get_album_palettes(
+        req.albumMidList, playlist_id=req.playlistId, request_id=req.requestId
+    )
+    return success(data=result)
@@ -0,0 +1,51 @@
+"""后台下载任务 API 路由"""
+from typing import Literal
+
+from fastapi import APIRouter
+
+from app.schemas.common import ApiResponse
+from app.schemas.download import DownloadJobCreateRequest, DownloadJobInfo, DownloadJobListResponse
+from app.schemas.response import success
+from app.services import download as services_download
+from app.utils.stream import event_stream_response
+
+router = APIRouter()
+
+
+@router.post("/jobs", response_model=ApiResponse[DownloadJobListResponse])
+async def create_download_jobs(req: DownloadJobCreateRequest):
+    """批量创建下载任务，返回新建任务"""
+    result = services_download.download_manager.submit(req.items)
+    return success(data=result)
+
+
+@router.post("/jobs/list", response_model=ApiResponse[DownloadJobListResponse])
+async def list_download_jobs():
+    """获取全部下载任务及进度（轮询）"""
+    return success(data=services_download.download_manager.list_jobs())
+
+
+@router.get("/jobs/stream")
+async def stream_download_jobs(format: Literal["ndjson", "sse"] = "sse"):
+    """订阅下载进度：先推送全部任务，之后推送有变化的任务"""
+    body = await services_download.stream_job_events(stream_format=format)
+    return event_stream_response(body, format)
+
+
+@router.post("/jobs/{job_id}/cancel", response_model=ApiResponse[DownloadJobInfo])
+async def cancel_download_job(job_id: str):
+    """取消下载任务（保留已下载分段，可重试续传）"""
+    return success(data=services_download.download_manager.cancel(job_id))
+
+
+@router.post("/jobs/{job_id}/retry", response_model=ApiResponse[DownloadJobInfo])
+async def retry_download_job(job_id: str):
+    """重试失败或已取消的下载任务"""
+    return success(data=services_download.download_manager.retry(job_id))
+
+
+@router.post("/jobs/{job_id}/remove", response_model=ApiResponse)
+async def remove_download_job(job_id: str):
+    """删除下载任务记录，未完成的任务同时删除临时文件"""
+    await services_download.download_manager.remove(job_id)
+    return success()
@@ -1,12 +1,20 @@
 """QQ音乐 API 路由——歌曲搜索、登录认证、用户歌单"""
-from fastapi import APIRouter
+from typing import Literal
+
+from fastapi import APIRouter, Header, Response
+from fastapi.responses import StreamingResponse
 
 from app.schemas import auth as schemas_auth
 from app.schemas import qqmusic as schemas_qqmusic
 from app.schemas.common import ApiResponse
-from app.schemas.response import success
+from app.schemas.response import conditional_success, success
+from app.services import audio_stream as services_audio_stream
 from app.services import auth as services_auth
+from app.services import playlist_sync as services_playlist_sync
 from app.services import qqmusic as services_qqmusic
+from app.services import song_prefetch as services_song_prefetch
+from app.services import track_match as services_track_match
+from app.utils.stream import event_stream_response
 
 router = APIRouter()
 
@@ -29,6 +37,22 @@ async def search_song(req: schemas_qqmusic.SearchRequest):
     return success(data=result)
 
 
+@router.post("/song/search-local", response_model=ApiResponse[schemas_qqmusic.SearchResponse])
+async def search_local_songs(req: schemas_qqmusic.LocalSearchRequest):
+    """在本地索引中检索已见过的歌曲（标题/歌手/专辑，支持拼音与首字母）"""
+    result = await services_qqmusic.search_local_songs(req.keyword, limit=req.limit, request_id=req.requestId)
+    return success(data=result)
+
+
+@router.post("/song/suggest", response_model=ApiResponse[schemas_qqmusic.SuggestResponse])
+async def suggest_keywords(req: schemas_qqmusic.SuggestRequest):
+    """搜索词补全（输入联想）；同一 sessionKey 的新请求会取消旧的在途请求"""
+    result = await services_qqmusic.suggest_keywords(
+        req.keyword, session_key=req.sessionKey, request_id=req.requestId
+    )
+    return success(data=result)
+
+
 @router.post("/song/album-img", response_model=ApiResponse[schemas_qqmusic.AlbumImgResponse])
 def get_album_images(req: schemas_qqmusic.AlbumImgRequest):
     """获取专辑封面"""
@@ -37,14 +61,44 @@ def get_album_images(req: schemas_qqmusic.AlbumImgRequest):
 
 @router.post("/song/song-url", response_model=ApiResponse[schemas_qqmusic.SongUrlResponse])
 async def get_song_urls(req: schemas_qqmusic.SongUrlRequest):
-    """获取歌曲链接（有凭证→FLAC，无凭证→ACC_96试听）"""
+    """获取歌曲链接（有凭证→按音质阶梯协商，无凭证→ACC_96试听）"""
     result = await services_qqmusic.get_song_url_list_v2(
         song_mid_list=req.songIdList,
         request_id=req.requestId,
+        max_quality=req.maxQuality,
+    )
+    return success(data=result)
+
+
+@router.post("/song/play-queue", response_model=ApiResponse[schemas_qqmusic.PlayQueueResponse])
+def register_play_queue(req: schemas_qqmusic.PlayQueueRequest):
+    """登记播放队列，后台提前解析即将播放歌曲的链接并在过期前续期"""
+    result = services_song_prefetch.register_play_queue(
+        song_mid_list=req.songIdList,
+        current_index=req.currentIndex,
+        max_quality=req.maxQuality,
     )
     return success(data=result)
 
 
+@router.get("/song/stream/{song_mid}")
+async def stream_song(
+    song_mid: str,
+    quality: Literal["flac", "ogg_320", "mp3_320", "mp3_128", "acc_96"] = "flac",
+    range_header: str | None = Header(default=None, alias="Range"),
+):
+    """在线播放音频流代理（支持 Range，已获取字节块落盘缓存，拖动与重播直接读本地）"""
+    stream = await services_audio_stream.open_song_stream(song_mid, range_header, max_quality=quality)
+    if stream.body is None:
+        return Response(status_code=stream.status_code, media_type=stream.media_type, headers=stream.headers)
+    return StreamingResponse(
+        stream.body,
+        status_code=stream.status_code,
+        media_type=stream.media_type,
+        headers=stream.headers,
+    )
+
+
 @router.post("/song/download-bundle", response_model=ApiResponse[schemas_qqmusic.SongDownloadBundleResponse])
 async def get_song_download_bundle(req: schemas_qqmusic.SongDownloadBundleRequest):
     """获取歌曲下载元数据包（含详情、封面、歌词、下载链接）"""
@@ -55,6 +109,41 @@ async def get_song_download_bundle(req: schemas_qqmusic.SongDownloadBundleReques
     return success(data=result)
 
 
+@router.post(
+    "/song/download-bundle/batch", response_model=ApiResponse[schemas_qqmusic.SongDownloadBundleBatchResponse]
+)
+async def get_song_download_bundles(req: schemas_qqmusic.SongDownloadBundleBatchRequest):
+    """批量获取歌曲下载元数据包（链接一次批量协商，按请求顺序返回，每首单独标记成功/失败）"""
+    result = await services_qqmusic.get_song_download_bundles(
+        song_mid_list=req.songMidList,
+        request_id=req.requestId,
+    )
+    return success(data=result)
+
+
+@router.post("/song/lyrics", response_model=ApiResponse[schemas_qqmusic.LyricsResponse])
+async def get_song_lyrics(req: schemas_qqmusic.LyricsRequest):
+    """获取歌词原文/翻译/音译（本地缓存优先，离线可用）"""
+    result = await services_qqmusic.get_song_lyrics(song_mid=req.songMid, request_id=req.requestId)
+    return success(data=result)
+
+
+@router.post("/song/lyrics/structured", response_model=ApiResponse[schemas_qqmusic.StructuredLyricsResponse])
+async def get_structured_lyrics(req: schemas_qqmusic.LyricsRequest):
+    """获取结构化歌词（按时间排序的行，原文/翻译/音译对齐，含逐字时间时一并返回）"""
+    result = await services_qqmusic.get_structured_lyrics(song_mid=req.songMid, request_id=req.requestId)
+    return success(data=result)
+
+
+@router.post("/song/lyrics/prefetch", response_model=ApiResponse[schemas_qqmusic.LyricsPrefetchResponse])
+async def prefetch_song_lyrics(req: schemas_qqmusic.LyricsPrefetchRequest):
+    """后台预取歌单或指定歌曲的歌词到本地缓存"""
+    result = await services_qqmusic.prefetch_song_lyrics(
+        req.songMidList, playlist_id=req.playlistId, request_id=req.requestId
+    )
+    return success(data=result)
+
+
 @router.post("/song/search-by-keyword", response_model=ApiResponse[schemas_qqmusic.SearchResponse])
 async def search_by_keyword(req: schemas_qqmusic.KeywordSearchRequest):
     """通过关键词搜索歌曲"""
@@ -67,44 +156,123 @@ async def search_by_keyword(req: schemas_qqmusic.KeywordSearchRequest):
     return success(data=result)
 
 
+@router.post("/song/search-by-keyword/batch")
+async def batch_search_by_keyword(req: schemas_qqmusic.BatchKeywordSearchRequest):
+    """批量关键词搜索（限流并发、遇限流退避），每个关键词完成即流式推送"""
+    body = await services_qqmusic.stream_batch_keyword_search(
+        req.keywords, req.pageSize, request_id=req.requestId, stream_format=req.format
+    )
+    return event_stream_response(body, req.format)
+
+
+@router.post("/song/match-tracks")
+async def match_local_tracks(req: schemas_qqmusic.TrackMatchRequest):
+    """本地音轨匹配在线歌曲（标题/歌手/时长打分），按输入顺序流式推送最佳 songMid 与置信度"""
+    body = await services_track_match.stream_track_matches(
+        req.tracks, request_id=req.requestId, stream_format=req.format
+    )
+    return event_stream_response(body, req.format)
+
+
 # ========== 用户数据 ==========
 
 
 @router.post("/user/playlists", response_model=ApiResponse[schemas_qqmusic.UserPlaylistsResponse])
-async def get_user_playlists():
-    """获取当前登录用户创建的歌单列表"""
-    return success(data=await services_qqmusic.get_user_playlists())
+async def get_user_playlists(if_none_match: str | None = Header(default=None, alias="If-None-Match")):
+    """获取当前登录用户创建的歌单列表（支持 ETag 条件请求）"""
+    return conditional_success(await services_qqmusic.get_user_playlists(), if_none_match)
 
 
 @router.post("/user/liked", response_model=ApiResponse[schemas_qqmusic.LikedSongsResponse])
-async def get_user_liked_songs(req: schemas_qqmusic.GetUserLikedRequest):
-    """获取当前登录用户喜欢的歌曲列表"""
+async def get_user_liked_songs(
+    req: schemas_qqmusic.GetUserLikedRequest,
+    if_none_match: str | None = Header(default=None, alias="If-None-Match"),
+):
+    """获取当前登录用户喜欢的歌曲列表（支持 ETag 条件请求）"""
     result = await services_qqmusic.get_user_liked_songs(
         page=req.page,
         page_size=req.pageSize,
     )
-    return success(data=result)
+    return conditional_success(result, if_none_match)
+
+
+@router.post("/user/liked/all", response_model=ApiResponse[schemas_qqmusic.LikedSongsResponse])
+async def get_user_liked_songs_all(
+    req: schemas_qqmusic.LikedAllSongsRequest,
+    if_none_match: str | None = Header(default=None, alias="If-None-Match"),
+):
+    """获取当前登录用户全部喜欢歌曲（并发分页 + 批量回填链接，短时缓存；支持 ETag 条件请求）"""
+    result = await services_qqmusic.get_user_liked_songs_all(request_id=req.requestId, refresh=req.refresh)
+    return conditional_success(result, if_none_match)
+
+
+@router.post("/user/liked/invalidate", response_model=ApiResponse)
+def invalidate_user_liked_songs():
+    """丢弃全部喜欢歌曲缓存（收藏或取消收藏后调用）"""
+    services_qqmusic.invalidate_user_liked_cache()
+    return success()
 
 
 # ========== 歌单详情 ==========
 
 
 @router.post("/playlist/{playlist_id}/songs", response_model=ApiResponse[schemas_qqmusic.PlaylistSongsResponse])
-async def get_playlist_songs(playlist_id: int, req: schemas_qqmusic.GetPlaylistSongsRequest):
-    """获取 QQ 音乐歌单内的歌曲列表（单页）"""
+async def get_playlist_songs(
+    playlist_id: int,
+    req: schemas_qqmusic.GetPlaylistSongsRequest,
+    if_none_match: str | None = Header(default=None, alias="If-None-Match"),
+):
+    """获取 QQ 音乐歌单内的歌曲列表（单页，支持 ETag 条件请求）"""
     result = await services_qqmusic.get_songlist_detail(
         playlist_id, req.page, req.pageSize, request_id=req.requestId
     )
-    return success(data=result)
+    return conditional_success(result, if_none_match)
 
 
 @router.post("/playlist/{playlist_id}/songs/all", response_model=ApiResponse[schemas_qqmusic.PlaylistSongsResponse])
-async def get_playlist_songs_all(playlist_id: int, req: schemas_qqmusic.PlaylistAllSongsRequest):
-    """获取 QQ 音乐歌单内的全部歌曲（自动迭代所有页码，一次性返回）"""
-    result = await services_qqmusic.get_songlist_detail_all(playlist_id, request_id=req.requestId)
+async def get_playlist_songs_all(
+    playlist_id: int,
+    req: schemas_qqmusic.PlaylistAllSongsRequest,
+    if_none_match: str | None = Header(default=None, alias="If-None-Match"),
+):
+    """获取 QQ 音乐歌单内的全部歌曲（首页取总数后并发拉取其余页，一次性返回；支持 ETag 条件请求）"""
+    result = await services_qqmusic.get_songlist_detail_all(
+        playlist_id, request_id=req.requestId, parallel=req.parallel
+    )
+    return conditional_success(result, if_none_match)
+
+
+@router.get("/playlist/{playlist_id}/songs/all/stream")
+async def stream_playlist_songs_all(
+    playlist_id: int,
+    requestId: str = "0",
+    format: Literal["ndjson", "sse"] = "ndjson",
+):
+    """流式获取 QQ 音乐歌单内的全部歌曲（逐页推送歌曲，随后按块推送播放链接补丁；不限页数）"""
+    body = await services_qqmusic.stream_songlist_detail_all(
+        playlist_id, request_id=requestId, stream_format=format
+    )
+    return event_stream_response(body, format)
+
+
+@router.post("/playlist/{playlist_id}/sync", response_model=ApiResponse[schemas_qqmusic.PlaylistSyncResponse])
+async def sync_playlist(playlist_id: int, req: schemas_qqmusic.PlaylistSyncRequest):
+    """歌单增量同步：按客户端版本返回新增/删除/移动差异，版本未知时返回全量"""
+    result = await services_playlist_sync.sync_playlist(
+        playlist_id, since_version=req.sinceVersion, request_id=req.requestId
+    )
     return success(data=result)
 
 
+# ========== 运行状态 ==========
+
+
+@router.post("/stats", response_model=ApiResponse[schemas_qqmusic.BackendStatsResponse])
+def get_backend_stats():
+    """获取后端运行统计（上游请求合并命中等）"""
+    return success(data=services_qqmusic.get_backend_stats())
+
+
 # ========== 登录认证 ==========
 
 
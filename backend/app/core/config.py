@@ -9,6 +9,25 @@ class Settings(BaseSettings):
     cors_origins: list[str] = ["http://localhost:9753", "null"]
     log_level: str = "INFO"
     operation_log_retention_days: int = Field(default=30, ge=7, le=30)
+    song_url_chunk_size: int = Field(default=50, ge=1, le=100)
+    song_url_max_concurrency: int = Field(default=4, ge=1, le=16)
+    song_url_prefetch_ahead: int = Field(default=5, ge=1, le=50)
+    songlist_page_concurrency: int = Field(default=4, ge=1, le=16)
+    song_metadata_ttl_hours: int = Field(default=168, ge=1)
+    batch_search_concurrency: int = Field(default=4, ge=1, le=16)
+    download_bundle_concurrency: int = Field(default=8, ge=1, le=32)
+    lyrics_prefetch_concurrency: int = Field(default=4, ge=1, le=16)
+    download_max_jobs: int = Field(default=3, ge=1, le=8)
+    download_segments: int = Field(default=4, ge=1, le=16)
+    audio_cache_max_mb: int = Field(default=1024, ge=64)
+    cover_cache_max_mb: int = Field(default=256, ge=16)
+    cover_prefetch_concurrency: int = Field(default=4, ge=1, le=16)
+    cdn_hosts: list[str] = [
+        "https://isure.stream.qqmusic.qq.com/",
+        "https://ws.stream.qqmusic.qq.com/",
+        "https://dl.stream.qqmusic.qq.com/",
+    ]
+    cdn_probe_interval_seconds: int = Field(default=300, ge=30)
 
     model_config = {"env_prefix": "APP_", "env_file": ".env"}
 
@@ -23,5 +23,13 @@ def _default_data_dir() -> Path:
 DATA_DIR = Path(_CONFIGURED_DATA_DIR).expanduser() if _CONFIGURED_DATA_DIR else _default_data_dir()
 CREDENTIAL_DIR = DATA_DIR / "credential"
 LOG_DIR = DATA_DIR / "logs"
+AUDIO_CACHE_DIR = DATA_DIR / "audio-cache"
+PLAYLIST_SNAPSHOT_DIR = DATA_DIR / "playlist-snapshots"
+SONG_METADATA_DB_PATH = DATA_DIR / "song-metadata.db"
+LYRICS_CACHE_DIR = DATA_DIR / "lyrics-cache"
+DOWNLOAD_JOBS_PATH = DATA_DIR / "download-jobs.json"
+COVER_CACHE_DIR = DATA_DIR / "cover-cache"
+PALETTE_CACHE_DIR = DATA_DIR / "palette-cache"
+SHARE_LINK_CACHE_PATH = DATA_DIR / "share-links.json"
 CREDENTIAL_PATH = str(CREDENTIAL_DIR / "credential.json")
 LOG_PATH = str(LOG_DIR / "operation.log")
@@ -10,19 +10,30 @@ from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
+from app.api.cover import router as cover_router
+from app.api.download import router as download_router
 from app.api.operation_log import router as operation_log_router
 from app.api.qqmusic import router as qqmusic_router
 from app.core.config import settings
+from app.qqmusic.cdn import cdn_probe_loop
 from app.qqmusic.client import reset_client
+from app.qqmusic.http_client import close_http_client
+from app.qqmusic.metadata_store import song_metadata_store
+from app.qqmusic.search_index import local_song_index
 from app.schemas.common import ErrorCode
 from app.schemas.response import error
 from app.services import auth as services_auth
+from app.services import download as services_download
 from app.services import operation_log as services_operation_log
+from app.services import song_prefetch as services_song_prefetch
 from app.utils.exception import ServiceException
 from app.utils.logger import setup_logger
 
 logger = setup_logger(__name__)
 
+# 封面路由按歌单 ID 拉取歌曲时同样需要最新凭证，但不记录请求日志
+CREDENTIAL_REFRESH_PREFIXES = ("/api/v1/qqmusic", "/api/v1/cover")
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -30,13 +41,20 @@ async def lifespan(app: FastAPI):
     cleanup_task = asyncio.create_task(
         services_operation_log.operation_log_cleanup_loop(settings.operation_log_retention_days)
     )
+    prefetch_task = asyncio.create_task(services_song_prefetch.song_url_prefetch_loop())
+    cdn_probe_task = asyncio.create_task(cdn_probe_loop())
+    index_task = asyncio.create_task(local_song_index.run())
+    download_task = asyncio.create_task(services_download.download_manager.run())
     try:
         yield
     finally:
-        cleanup_task.cancel()
-        with suppress(asyncio.CancelledError):
-            await cleanup_task
+        for task in (cleanup_task, prefetch_task, cdn_probe_task, index_task, download_task):
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+        await close_http_client()
         await reset_client()
+        song_metadata_store.close()
 
 
 app = FastAPI(title="LLMusic API", version="1.0.0", lifespan=lifespan)
@@ -47,10 +65,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
 app.include_router(qqmusic_router, prefix="/api/v1/qqmusic")
 app.include_router(operation_log_router, prefix="/api/v1/operation-log")
+app.include_router(download_router, prefix="/api/v1/download")
+app.include_router(cover_router, prefix="/api/v1/cover")
 
 
 @app.middleware("http")
@@ -58,12 +79,13 @@ async def operation_log_middleware(request: Request, call_next):
     """业务请求前自动刷新凭证，并记录重要网络请求"""
     path = request.url.path
 
-    if path.startswith("/api/v1/qqmusic"):
+    if path.startswith(CREDENTIAL_REFRESH_PREFIXES):
         await services_auth.ensure_credential_fresh()
 
     if path.startswith("/api/v1/qqmusic") and not path.startswith("/api/v1/operation-log"):
         start = time.perf_counter()
-        response = await call_next(request)
+        async with services_song_prefetch.interactive_request():
+            response = await call_next(request)
         duration_ms = int((time.perf_counter() - start) * 1000)
 
         error_code = 0
@@ -0,0 +1,42 @@
+"""QQ 音乐进程内缓存（登录态切换时统一清空）"""
+from app.utils.cache import TTLCache
+
+SONG_URL_CACHE_MAX_SIZE = 5000
+SONG_URL_DEFAULT_TTL_SECONDS = 3600
+SONG_URL_UNAVAILABLE_TTL_SECONDS = 300
+LIKED_SONGS_CACHE_MAX_SIZE = 8
+LIKED_SONGS_CACHE_TTL_SECONDS = 120
+SEARCH_CACHE_MAX_SIZE = 200
+SEARCH_CACHE_TTL_SECONDS = 300
+SUGGEST_CACHE_MAX_SIZE = 500
+SUGGEST_CACHE_TTL_SECONDS = 600
+STRUCTURED_LYRICS_CACHE_MAX_SIZE = 200
+STRUCTURED_LYRICS_CACHE_TTL_SECONDS = 3600
+
+# key: (mid, 文件类型编码, 凭证身份)  value: SongUrlItem
+song_url_cache = TTLCache(max_size=SONG_URL_CACHE_MAX_SIZE, ttl_seconds=SONG_URL_DEFAULT_TTL_SECONDS)
+
+# key: 同 song_url_cache  value: True；上游明确答复所有音质均无链接的歌曲，短期内不再重复请求
+song_url_unavailable_cache = TTLCache(max_size=SONG_URL_CACHE_MAX_SIZE, ttl_seconds=SONG_URL_UNAVAILABLE_TTL_SECONDS)
+
+# key: encrypt_uin  value: LikedSongsResponse（全部喜欢歌曲）
+liked_songs_cache = TTLCache(max_size=LIKED_SONGS_CACHE_MAX_SIZE, ttl_seconds=LIKED_SONGS_CACHE_TTL_SECONDS)
+
+# key: (归一化关键词, 页码, 每页数量)  value: SearchResponse；搜索结果与登录态无关，不随登录切换清空
+search_cache = TTLCache(max_size=SEARCH_CACHE_MAX_SIZE, ttl_seconds=SEARCH_CACHE_TTL_SECONDS)
+
+# key: 归一化输入前缀  value: 补全建议列表；与登录态无关
+suggest_cache = TTLCache(max_size=SUGGEST_CACHE_MAX_SIZE, ttl_seconds=SUGGEST_CACHE_TTL_SECONDS)
+
+
+# key: 歌曲 mid  value: StructuredLyricsResponse；由本地歌词缓存解析而来，与登录态无关
+structured_lyrics_cache = TTLCache(
+    max_size=STRUCTURED_LYRICS_CACHE_MAX_SIZE, ttl_seconds=STRUCTURED_LYRICS_CACHE_TTL_SECONDS
+)
+
+
+def clear_caches():
+    """清空所有与登录态绑定的缓存"""
+    song_url_cache.clear()
+    song_url_unavailable_cache.clear()
+    liked_songs_cache.clear()
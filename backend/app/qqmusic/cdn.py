@@ -0,0 +1,151 @@
+"""QQ 音乐音频 CDN 节点选择：后台测量各候选节点延迟，按滑动平均得分选最快节点并支持故障切换"""
+import asyncio
+import time
+from contextlib import suppress
+from dataclasses import dataclass
+from urllib.parse import urlparse
+
+from app.core.config import settings
+from app.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+PROBE_TIMEOUT_SECONDS = 3
+PROBE_FAILURE_PENALTY_SECONDS = 10
+SCORE_SMOOTHING = 0.3
+
+
+@dataclass
+class _HostState:
+    host: str
+    score: float | None = None
+    connect_seconds: float | None = None
+    first_byte_seconds: float | None = None
+    failures: int = 0
+
+
+class CdnSelector:
+    """维护候选节点得分（连接 + 首字节耗时的指数滑动平均，越低越好），未测量时按配置顺序"""
+
+    def __init__(self, hosts: list[str], probe_timeout: float = PROBE_TIMEOUT_SECONDS):
+        self.probe_timeout = probe_timeout
+        self._states = [_HostState(host=host if host.endswith("/") else f"{host}/") for host in hosts]
+
+    @property
+    def hosts(self) -> list[str]:
+        return [state.host for state in self._ranked()]
+
+    def best_host(self) -> str:
+        return self._ranked()[0].host
+
+    def build_url(self, purl: str) -> str:
+        return f"{self.best_host()}{purl}"
+
+    def rewrite(self, url: str) -> str:
+        """把已知节点的链接改写到当前最快节点（vkey 与节点无关，可跨节点复用）"""
+        host = self._match_host(url)
+        if host is None:
+            return url
+        return f"{self.best_host()}{url[len(host):]}"
+
+    def candidate_urls(self, url: str) -> list[str]:
+        """故障切换顺序：原链接在前，其余节点按得分排序"""
+        host = self._match_host(url)
+        if host is None:
+            return [url]
+        path = url[len(host):]
+        return [url] + [f"{other}{path}" for other in self.hosts if other != host]
+
+    def report_failure(self, url: str) -> None:
+        """回源失败时惩罚对应节点，使后续请求切换到其他节点"""
+        host = self._match_host(url)
+        for state in self._states:
+            if state.host == host:
+                state.failures += 1
+                self._record(state, PROBE_FAILURE_PENALTY_SECONDS)
+                logger.warning(f"CDN 节点回源失败，降低优先级: host={host}")
+
+    async def probe_all(self) -> None:
+        await asyncio.gather(*(self._probe(state) for state in self._states))
+
+    def stats(self) -> list[dict]:
+        return [
+            {
+                "host": state.host,
+                "scoreMs": _to_ms(state.score),
+                "connectMs": _to_ms(state.connect_seconds),
+                "firstByteMs": _to_ms(state.first_byte_seconds),
+                "failures": state.failures,
+            }
+            for state in self._ranked()
+        ]
+
+    def _ranked(self) -> list[_HostState]:
+        # 已测量的节点按得分在前，未测量的节点排在其后（等待探测），不抢占已知最快节点；sorted 稳定，同分保持配置顺序
+        return sorted(self._states, key=lambda state: (state.score is None, state.score or 0))
+
+    def _match_host(self, url: str) -> str | None:
+        for state in self._states:
+            if url.startswith(state.host):
+                return state.host
+        return None
+
+    def _record(self, state: _HostState, sample: float) -> None:
+        if state.score is None:
+            state.score = sample
+        else:
+            state.score = SCORE_SMOOTHING * sample + (1 - SCORE_SMOOTHING) * state.score
+
+    async def _probe(self, state: _HostState) -> None:
+        try:
+            connect_seconds, first_byte_seconds = await self._measure(state.host)
+        except (OSError, asyncio.TimeoutError, ValueError):
+            state.failures += 1
+            self._record(state, PROBE_FAILURE_PENALTY_SECONDS)
+            logger.info(f"CDN 节点探测失败: host={state.host}")
+            return
+        state.connect_seconds = connect_seconds
+        state.first_byte_seconds = first_byte_seconds
+        self._record(state, connect_seconds + first_byte_seconds)
+
+    async def _measure(self, host: str) -> tuple[float, float]:
+        """建立连接并发送 HEAD 请求，分别返回连接耗时与首字节耗时（秒）"""
+        parsed = urlparse(host)
+        port = parsed.port or (443 if parsed.scheme == "https" else 80)
+
+        start = time.perf_counter()
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(parsed.hostname, port, ssl=parsed.scheme == "https"),
+            timeout=self.probe_timeout,
+        )
+        try:
+            connected = time.perf_counter()
+            writer.write(f"HEAD / HTTP/1.1\r\nHost: {parsed.netloc}\r\nConnection: close\r\n\r\n".encode())
+            await writer.drain()
+            status_line = await asyncio.wait_for(reader.readline(), timeout=self.probe_timeout)
+            if not status_line:
+                raise ValueError("连接被关闭")
+            return connected - start, time.perf_counter() - connected
+        finally:
+            writer.close()
+            with suppress(Exception):
+                await writer.wait_closed()
+
+
+def _to_ms(seconds: float | None) -> int | None:
+    return round(seconds * 1000) if seconds is not None else None
+
+
+cdn_selector = CdnSelector(settings.cdn_hosts)
+
+
+async def cdn_probe_loop() -> None:
+    """按固定间隔探测全部候选节点；只有一个节点时无需探测；任务取消时正常退出"""
+    if len(settings.cdn_hosts) <= 1:
+        return
+    while True:
+        try:
+            await cdn_selector.probe_all()
+        except Exception:
+            logger.warning("CDN 节点探测异常", exc_info=True)
+        await asyncio.sleep(settings.cdn_probe_interval_seconds)
@@ -1,18 +1,101 @@
 """QQ Music API 客户端管理"""
 import asyncio
+import json
+from dataclasses import dataclass
 
 from qqmusic_api import Client
 from qqmusic_api.models.request import Credential
 
 from app.credential.get_credential import get_credential
+from app.qqmusic.cache import clear_caches
 from app.schemas.common import ErrorCode
 from app.utils.exception import ServiceException
 from app.utils.logger import setup_logger
 
 logger = setup_logger(__name__)
 
+# 每次构建请求都会随机生成的参数，不参与合并键计算
+_VOLATILE_PARAM_KEYS = frozenset({"guid", "search_id", "searchid"})
+
 _client: Client | None = None
 _client_lock = asyncio.Lock()
+_coalesce_stats = {"hits": 0, "misses": 0}
+
+
+@dataclass
+class _InFlightRequest:
+    task: asyncio.Task
+    waiters: int = 0
+
+
+class CoalescingClient(Client):
+    """对并发的相同请求（同一 SDK 方法与参数）只发一次上游调用，结果/异常共享给所有等待方"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._inflight: dict[str, _InFlightRequest] = {}
+
+    async def execute(self, request):
+        key = _request_key(request)
+        if key is None:
+            return await super().execute(request)
+
+        entry = self._inflight.get(key)
+        if entry is None or entry.task.cancelling():
+            _coalesce_stats["misses"] += 1
+            entry = _InFlightRequest(task=asyncio.create_task(super().execute(request)))
+            self._inflight[key] = entry
+            entry.task.add_done_callback(lambda _: self._release(key, entry))
+        else:
+            _coalesce_stats["hits"] += 1
+
+        entry.waiters += 1
+        try:
+            # shield：单个等待方被取消不影响其他等待方，最后一个等待方离开时才取消上游调用
+            return await asyncio.shield(entry.task)
+        finally:
+            entry.waiters -= 1
+            if entry.waiters == 0 and not entry.task.done():
+                entry.task.cancel()
+
+    def _release(self, key, entry):
+        """请求完成后移出在途表；异常已由等待方接收，这里只读取一次避免未取回告警"""
+        if self._inflight.get(key) is entry:
+            del self._inflight[key]
+        if not entry.task.cancelled():
+            entry.task.exception()
+
+
+def _request_key(request):
+    """由模块、方法、平台、凭证与参数生成合并键，参数无法序列化时返回 None 表示不合并"""
+    param = request.param
+    if isinstance(param, dict):
+        param = {k: v for k, v in param.items() if k not in _VOLATILE_PARAM_KEYS}
+    credential = request.credential
+    try:
+        return json.dumps(
+            [
+                request.module,
+                request.method,
+                request.is_jce,
+                str(request.platform or ""),
+                credential.musicid if credential is not None else None,
+                credential.musickey if credential is not None else None,
+                request.comm,
+                param,
+            ],
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str,
+        )
+    except (TypeError, ValueError):
+        return None
+
+
+def get_coalesce_stats():
+    """请求合并命中统计：hits 为复用在途请求次数，misses 为实际发往上游次数"""
+    inflight = len(_client._inflight) if isinstance(_client, CoalescingClient) else 0
+    return {**_coalesce_stats, "inflight": inflight}
 
 
 async def get_client():
@@ -32,7 +115,7 @@ async def get_client():
                 logger.warning("未找到 QQ 音乐登录凭证，使用匿名客户端（部分功能受限）")
             else:
                 raise
-        _client = Client(credential=credential)
+        _client = CoalescingClient(credential=credential)
     return _client
 
 
@@ -45,7 +128,8 @@ async def refresh_client(credential: Credential):
                 await _client.close()
             except Exception:
                 logger.warning("关闭旧 Client 失败，继续创建新实例", exc_info=True)
-        _client = Client(credential=credential)
+        _client = CoalescingClient(credential=credential)
+        clear_caches()
 
 
 async def reset_client():
@@ -58,3 +142,4 @@ async def reset_client():
             except Exception:
                 logger.warning("关闭 Client 失败", exc_info=True)
             _client = None
+        clear_caches()
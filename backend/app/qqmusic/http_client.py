@@ -0,0 +1,59 @@
+"""共享 HTTP 连接池：分享链接解析走 HTTP/2 客户端；音频回源、后台下载、封面回源走 HTTP/1.1 客户端，由应用 lifespan 关闭"""
+import httpx
+
+# 各调用方按需在请求上覆盖超时
+DEFAULT_TIMEOUT_SECONDS = 15
+CONNECT_TIMEOUT_SECONDS = 10
+MAX_CONNECTIONS = 64
+MAX_KEEPALIVE_CONNECTIONS = 32
+KEEPALIVE_EXPIRY_SECONDS = 60
+
+_http_client: httpx.AsyncClient | None = None
+_media_client: httpx.AsyncClient | None = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """获取 HTTP/2 共享客户端（首次使用时创建），仅用于分享链接解析等小请求；需要读取 302 的调用方在请求上关闭重定向"""
+    global _http_client
+    if _http_client is None:
+        _http_client = _build_client(http2=True)
+    return _http_client
+
+
+def get_media_client() -> httpx.AsyncClient:
+    """获取 HTTP/1.1 共享客户端（首次使用时创建）
+
+    HTTP/2 会把同一主机的并发请求复用到一条连接上，下载分段并发失去意义；
+    音频回源、后台下载、封面回源因此使用独立连接池，每个并发请求各占一条连接
+    """
+    global _media_client
+    if _media_client is None:
+        _media_client = _build_client(http2=False)
+    return _media_client
+
+
+async def close_http_client():
+    """应用关闭时释放全部连接池"""
+    global _http_client, _media_client
+    for client in (_http_client, _media_client):
+        if client is not None:
+            await client.aclose()
+    _http_client = None
+    _media_client = None
+
+
+"""辅助函数"""
+
+
+def _build_client(http2: bool) -> httpx.AsyncClient:
+    """默认跟随重定向"""
+    return httpx.AsyncClient(
+        http2=http2,
+        follow_redirects=True,
+        timeout=httpx.Timeout(DEFAULT_TIMEOUT_SECONDS, connect=CONNECT_TIMEOUT_SECONDS),
+        limits=httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=KEEPALIVE_EXPIRY_SECONDS,
+        ),
+    )
@@ -0,0 +1,5 @@
+"""QQ 音乐资源标识校验"""
+import re
+
+# 歌曲/专辑 MID 只含字母数字，拼接到缓存路径或上游 URL 前先校验
+MID_PATTERN = re.compile(r"^[0-9A-Za-z]+$")
@@ -0,0 +1,92 @@
+"""歌词解析：LRC / QRC（逐字）解析为按时间排序的行，并把翻译、音译按时间戳对齐到原文行"""
+import bisect
+import html
+import re
+
+from app.schemas.qqmusic import LyricLine, LyricWord
+
+# 翻译/音译行与原文行时间戳的最大允许偏差（QRC 为毫秒，LRC 常为百分秒，存在取整误差）
+ALIGN_TOLERANCE_MS = 500
+# QQ 音乐翻译中用于占位的空行文本
+_PLACEHOLDER_TEXTS = {"//", "/"}
+
+_LRC_TIME = re.compile(r"\[(\d+):(\d+)(?:[.:](\d+))?\]")
+_LRC_OFFSET = re.compile(r"^\[offset:\s*([+-]?\d+)\s*\]", re.IGNORECASE)
+_QRC_CONTENT = re.compile(r'LyricContent="(.*?)"\s*/>', re.DOTALL)
+_QRC_LINE = re.compile(r"^\[(\d+),(\d+)\](.*)$")
+_QRC_WORD = re.compile(r"(.*?)\((\d+),(\d+)\)")
+
+
+def parse_lrc(text: str) -> list[tuple[int, str]]:
+    """解析 LRC，返回按时间排序的 (毫秒, 文本)；一行多个时间标签时展开为多行，应用 [offset:]"""
+    offset = 0
+    lines = []
+    for raw in (text or "").splitlines():
+        raw = raw.strip()
+        offset_match = _LRC_OFFSET.match(raw)
+        if offset_match:
+            offset = int(offset_match.group(1))
+            continue
+        times = []
+        position = 0
+        while match := _LRC_TIME.match(raw, position):
+            minutes, seconds, fraction = match.groups()
+            fraction_ms = int(fraction.ljust(3, "0")[:3]) if fraction else 0
+            times.append(int(minutes) * 60000 + int(seconds) * 1000 + fraction_ms)
+            position = match.end()
+        content = raw[position:].strip()
+        lines.extend((time_ms, content) for time_ms in times)
+    # LRC 中 offset 为正表示歌词提前显示
+    return sorted((max(time_ms - offset, 0), content) for time_ms, content in lines)
+
+
+def parse_qrc(text: str) -> list[LyricLine]:
+    """解析 QRC 逐字歌词（XML 包裹或纯文本），每行 [起始,时长] 后跟 字(起始,时长)，时间均为毫秒"""
+    match = _QRC_CONTENT.search(text or "")
+    content = html.unescape(match.group(1)) if match else (text or "")
+    lines = []
+    for raw in content.splitlines():
+        line_match = _QRC_LINE.match(raw.strip())
+        if line_match is None:
+            continue
+        start, duration, body = int(line_match.group(1)), int(line_match.group(2)), line_match.group(3)
+        words = [
+            LyricWord(text=word, startMs=int(word_start), durationMs=int(word_duration))
+            for word, word_start, word_duration in _QRC_WORD.findall(body)
+        ]
+        text_value = "".join(word.text for word in words) if words else body
+        lines.append(LyricLine(timeMs=start, durationMs=duration, text=text_value.strip(), words=words))
+    lines.sort(key=lambda line: line.timeMs)
+    return lines
+
+
+def build_lyric_lines(lyric: str, trans: str = "", roma: str = "", qrc: str = "") -> list[LyricLine]:
+    """合并为结构化歌词行：有 QRC 时以其为主（带逐字时间），否则以 LRC 原文为主；翻译/音译按最近时间戳对齐"""
+    lines = parse_qrc(qrc) if qrc else []
+    if not lines:
+        lines = [LyricLine(timeMs=time_ms, text=text) for time_ms, text in parse_lrc(lyric)]
+        for line, following in zip(lines, lines[1:]):
+            line.durationMs = following.timeMs - line.timeMs
+
+    _align(lines, parse_lrc(trans), "trans")
+    _align(lines, parse_lrc(roma), "roma")
+    return lines
+
+
+def _align(lines: list[LyricLine], secondary: list[tuple[int, str]], field: str) -> None:
+    """把次要歌词逐行写入时间最接近的原文行（偏差超过 ALIGN_TOLERANCE_MS 或占位文本时丢弃）"""
+    starts = [line.timeMs for line in lines]
+    for time_ms, text in secondary:
+        if not text or text in _PLACEHOLDER_TEXTS:
+            continue
+        slot = bisect.bisect_left(starts, time_ms)
+        nearest = min(
+            (index for index in (slot - 1, slot) if 0 <= index < len(lines)),
+            key=lambda index: abs(starts[index] - time_ms),
+            default=None,
+        )
+        if nearest is None or abs(starts[nearest] - time_ms) > ALIGN_TOLERANCE_MS:
+            continue
+        line = lines[nearest]
+        if not getattr(line, field):
+            setattr(line, field, text)
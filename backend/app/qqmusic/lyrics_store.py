@@ -0,0 +1,95 @@
+"""歌词持久化缓存：解密后的歌词按内容哈希存为对象文件（相同歌词只存一份），每个 mid 一个引用文件指向对象，离线可读"""
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+
+from app.core.paths import LYRICS_CACHE_DIR
+from app.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# 上游无歌词时也记录引用，过了这么久再重新请求（可能后来补录）
+EMPTY_LYRICS_RETRY_SECONDS = 24 * 3600
+
+
+@dataclass
+class LyricsEntry:
+    """解密后的歌词文本（LRC）"""
+    lyric: str = ""
+    trans: str = ""
+    roma: str = ""
+
+    @property
+    def empty(self) -> bool:
+        return not (self.lyric or self.trans or self.roma)
+
+    def to_text(self) -> str:
+        """原文、翻译、音译以空行拼接（下载元数据包的歌词格式）"""
+        return "\n\n".join(part for part in (self.lyric, self.trans, self.roma) if part)
+
+
+class LyricsStore:
+    """objects/<哈希前两位>/<sha256>.json 存内容，refs/<mid>.json 记录 {hash, fetchedAt}；均为临时文件原子替换
+
+    kind 区分同一首歌的不同歌词来源：lrc 为逐行歌词（含翻译/音译），qrc 为逐字歌词（lyric 字段存 QRC 文本）
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def get(self, song_mid: str, kind: str = "lrc") -> LyricsEntry | None:
+        """读取缓存歌词；未缓存、无歌词记录已过重试期或文件损坏时返回 None"""
+        ref = self._read_json(self._ref_path(song_mid, kind))
+        if ref is None or "hash" not in ref:
+            return None
+        content = self._read_json(self._object_path(ref["hash"]))
+        if content is None:
+            return None
+        entry = LyricsEntry(**{key: content.get(key, "") for key in ("lyric", "trans", "roma")})
+        if entry.empty and time.time() - ref.get("fetchedAt", 0) > EMPTY_LYRICS_RETRY_SECONDS:
+            return None
+        return entry
+
+    def put(self, song_mid: str, entry: LyricsEntry, kind: str = "lrc") -> str:
+        """写入歌词内容（已存在相同内容时只写引用），返回内容哈希"""
+        payload = json.dumps(asdict(entry), ensure_ascii=False, sort_keys=True).encode("utf-8")
+        digest = hashlib.sha256(payload).hexdigest()
+        object_path = self._object_path(digest)
+        if not object_path.exists():
+            self._write_atomic(object_path, payload)
+        ref = {"hash": digest, "fetchedAt": int(time.time())}
+        self._write_atomic(self._ref_path(song_mid, kind), json.dumps(ref).encode("utf-8"))
+        return digest
+
+    def _ref_path(self, song_mid: str, kind: str):
+        suffix = "" if kind == "lrc" else f".{kind}"
+        return self.root / "refs" / f"{song_mid}{suffix}.json"
+
+    def _object_path(self, digest: str):
+        return self.root / "objects" / digest[:2] / f"{digest}.json"
+
+    @staticmethod
+    def _read_json(path) -> dict | None:
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            logger.warning(f"歌词缓存文件损坏，已忽略: path={path}")
+            return None
+        return data if isinstance(data, dict) else None
+
+    @staticmethod
+    def _write_atomic(path, data: bytes) -> None:
+        os.makedirs(path.parent, exist_ok=True)
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        with open(tmp_path, "wb") as file:
+            file.write(data)
+        os.replace(tmp_path, path)
+
+
+lyrics_store = LyricsStore(LYRICS_CACHE_DIR)
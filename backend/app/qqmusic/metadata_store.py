@@ -0,0 +1,214 @@
+"""歌曲元数据本地存储：SQLite 持久化歌曲/专辑/歌手（按 mid 归一化），搜索、歌单、喜欢、详情响应写穿"""
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+
+from app.core.paths import SONG_METADATA_DB_PATH
+from app.schemas.qqmusic import AlbumInfo, SongItem
+from app.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS albums (
+    mid TEXT PRIMARY KEY,
+    id INTEGER NOT NULL DEFAULT 0,
+    name TEXT NOT NULL DEFAULT '',
+    cover_url TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS singers (
+    mid TEXT PRIMARY KEY,
+    id INTEGER NOT NULL DEFAULT 0,
+    name TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS songs (
+    mid TEXT PRIMARY KEY,
+    id INTEGER NOT NULL DEFAULT 0,
+    name TEXT NOT NULL DEFAULT '',
+    singer TEXT NOT NULL DEFAULT '',
+    genre TEXT NOT NULL DEFAULT '',
+    lan TEXT NOT NULL DEFAULT '',
+    create_time TEXT NOT NULL DEFAULT '',
+    duration TEXT NOT NULL DEFAULT '',
+    album_mid TEXT NOT NULL DEFAULT '',
+    updated_at INTEGER NOT NULL,
+    detail_at INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_songs_id ON songs (id);
+CREATE TABLE IF NOT EXISTS song_singers (
+    song_mid TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    singer_mid TEXT NOT NULL,
+    PRIMARY KEY (song_mid, position)
+);
+"""
+
+# 列表类响应（搜索/歌单/喜欢）不含流派与语言，更新时保留详情写入的值
+_UPSERT_SONG = """
+INSERT INTO songs (mid, id, name, singer, genre, lan, create_time, duration, album_mid, updated_at, detail_at)
+VALUES (:mid, :id, :name, :singer, :genre, :lan, :create_time, :duration, :album_mid, :updated_at, :detail_at)
+ON CONFLICT(mid) DO UPDATE SET
+    id = excluded.id,
+    name = excluded.name,
+    singer = excluded.singer,
+    genre = CASE WHEN excluded.detail_at > 0 THEN excluded.genre ELSE songs.genre END,
+    lan = CASE WHEN excluded.detail_at > 0 THEN excluded.lan ELSE songs.lan END,
+    create_time = excluded.create_time,
+    duration = excluded.duration,
+    album_mid = excluded.album_mid,
+    updated_at = excluded.updated_at,
+    detail_at = MAX(excluded.detail_at, songs.detail_at)
+"""
+
+_UPSERT_ALBUM = """
+INSERT INTO albums (mid, id, name, cover_url) VALUES (:mid, :id, :name, :cover_url)
+ON CONFLICT(mid) DO UPDATE SET
+    id = excluded.id,
+    name = CASE WHEN excluded.name != '' THEN excluded.name ELSE albums.name END,
+    cover_url = excluded.cover_url
+"""
+
+_UPSERT_SINGER = """
+INSERT INTO singers (mid, id, name) VALUES (?, ?, ?)
+ON CONFLICT(mid) DO UPDATE SET id = excluded.id, name = excluded.name
+"""
+
+_SELECT_SONGS = """
+SELECT s.mid, s.id, s.name, s.singer, s.genre, s.lan, s.create_time, s.duration, s.detail_at,
+       a.mid, a.id, a.name, a.cover_url
+FROM songs s LEFT JOIN albums a ON a.mid = s.album_mid
+"""
+
+
+@dataclass
+class SongRecord:
+    """待写入的一首歌：响应中的 SongItem 与原始歌手列表 [(mid, id, name)]"""
+    item: SongItem
+    singers: list[tuple[str, int, str]] = field(default_factory=list)
+
+
+class SongMetadataStore:
+    """单连接 + 线程锁，供 asyncio.to_thread 调用；批量写入在一个事务内完成"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+
+    def upsert_songs(self, records: list[SongRecord], with_detail: bool = False) -> int:
+        """批量写入歌曲及其专辑、歌手；with_detail=True 表示来自详情接口（含流派/语言并刷新新鲜度）"""
+        now = int(time.time())
+        song_rows, album_rows, singer_rows, link_rows = [], [], [], []
+        for record in records:
+            item = record.item
+            if not item.songMid:
+                continue
+            album = item.album
+            song_rows.append(
+                {
+                    "mid": item.songMid,
+                    "id": item.songId,
+                    "name": item.songName,
+                    "singer": item.singer,
+                    "genre": item.genre,
+                    "lan": item.lan,
+                    "create_time": item.createTime,
+                    "duration": item.duration,
+                    "album_mid": album.albumMid,
+                    "updated_at": now,
+                    "detail_at": now if with_detail else 0,
+                }
+            )
+            if album.albumMid:
+                album_rows.append(
+                    {"mid": album.albumMid, "id": album.albumId, "name": album.albumName, "cover_url": album.albumCoverUrl}
+                )
+            for position, (singer_mid, singer_id, singer_name) in enumerate(record.singers):
+                if singer_mid:
+                    singer_rows.append((singer_mid, singer_id, singer_name))
+                    link_rows.append((item.songMid, position, singer_mid))
+
+        if not song_rows:
+            return 0
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany(_UPSERT_ALBUM, album_rows)
+                conn.executemany(_UPSERT_SINGER, singer_rows)
+                conn.executemany(_UPSERT_SONG, song_rows)
+                conn.executemany(
+                    "DELETE FROM song_singers WHERE song_mid = ?", [(row["mid"],) for row in song_rows]
+                )
+                conn.executemany("INSERT OR REPLACE INTO song_singers VALUES (?, ?, ?)", link_rows)
+        return len(song_rows)
+
+    def get_detail_by_id(self, song_id: int, max_age_seconds: float) -> SongItem | None:
+        """按歌曲 ID 读取详情；仅当详情写入时间在 max_age_seconds 内时返回"""
+        with self._lock:
+            row = self._connect().execute(
+                f"{_SELECT_SONGS} WHERE s.id = ? AND s.detail_at >= ? ORDER BY s.detail_at DESC LIMIT 1",
+                (song_id, int(time.time() - max_age_seconds)),
+            ).fetchone()
+        return _row_to_item(row) if row else None
+
+    def get_by_mids(self, song_mid_list: list[str]) -> dict[str, SongItem]:
+        """按 mid 批量读取已知歌曲元数据"""
+        result = {}
+        with self._lock:
+            conn = self._connect()
+            for start in range(0, len(song_mid_list), 500):
+                chunk = song_mid_list[start : start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                for row in conn.execute(f"{_SELECT_SONGS} WHERE s.mid IN ({placeholders})", chunk):
+                    result[row[0]] = _row_to_item(row)
+        return result
+
+    def list_index_fields(self) -> list[tuple[str, str, str, str]]:
+        """全部歌曲的 (mid, 标题, 歌手, 专辑名)，按最近写入时间由旧到新，供重建本地搜索索引"""
+        with self._lock:
+            return self._connect().execute(
+                "SELECT s.mid, s.name, s.singer, COALESCE(a.name, '') FROM songs s "
+                "LEFT JOIN albums a ON a.mid = s.album_mid ORDER BY s.updated_at, s.rowid"
+            ).fetchall()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        """首次使用时建库建表（需持锁调用）"""
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+
+def _row_to_item(row) -> SongItem:
+    mid, song_id, name, singer, genre, lan, create_time, duration, _, album_mid, album_id, album_name, cover = row
+    return SongItem(
+        songId=song_id,
+        songMid=mid,
+        songName=name,
+        singer=singer,
+        genre=genre,
+        lan=lan,
+        createTime=create_time,
+        album=AlbumInfo(
+            albumId=album_id or 0,
+            albumMid=album_mid or "",
+            albumName=album_name or "",
+            albumCoverUrl=cover or "",
+        ),
+        duration=duration,
+        songUrl=None,
+    )
+
+
+song_metadata_store = SongMetadataStore(SONG_METADATA_DB_PATH)
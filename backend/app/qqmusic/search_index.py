@@ -0,0 +1,293 @@
+"""本地歌曲全文索引：对元数据库中的歌曲按标题/歌手/专辑建立 n-gram 倒排索引，支持拼音全拼与首字母检索
+
+索引只存 mid 与可检索文本，歌曲元数据以元数据库为准；启动时由元数据库重建，写入排队后由后台任务批量合入
+"""
+import asyncio
+import heapq
+import re
+import threading
+import unicodedata
+from array import array
+from bisect import bisect_left
+from collections.abc import Iterable, Iterator
+from functools import lru_cache
+
+from pypinyin import lazy_pinyin
+
+from app.qqmusic.metadata_store import song_metadata_store
+from app.schemas.qqmusic import SongItem
+from app.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# 候选过多（如只输入歌手名）时按新到旧校验，凑够这么多条命中即停止，保证查询耗时有界
+MIN_RANK_POOL = 200
+# 多词查询沿最短倒排表由新到旧分块求交，首块文档数（之后每块翻倍）
+INTERSECT_FIRST_BLOCK = 256
+# 块内候选数乘以该值仍小于另一倒排表对应区间长度时，逐个二分查找校验，不再遍历该区间
+PROBE_COST_FACTOR = 16
+# 标题/歌手/专辑命中权重（须降序，评分据此提前结束）
+_FIELD_WEIGHTS = (3, 2, 1)
+# 同一字段的多种可检索形式拼接为一个字符串，查询词经归一化不含该字符，不会跨形式命中
+_FORM_SEPARATOR = "\x00"
+_CJK_RUN = re.compile(r"[㐀-䶿一-鿿]+")
+_WORD = re.compile(r"[0-9a-z]+")
+
+
+class _IndexState:
+    """文档按追加顺序编号（越新编号越大），倒排表为文档编号递增的 array('I')；歌曲文本变化时旧文档置空"""
+
+    def __init__(self):
+        self.mids: list[str | None] = []
+        self.texts: list[tuple[tuple[int, str], ...] | None] = []
+        self.doc_by_mid: dict[str, int] = {}
+        self.postings: dict[str, array] = {}
+
+    @property
+    def tombstones(self) -> int:
+        return len(self.mids) - len(self.doc_by_mid)
+
+    def add(self, mid: str, texts: tuple[tuple[int, str], ...], terms: set[str]) -> None:
+        doc_id = self.doc_by_mid.get(mid)
+        if doc_id is not None:
+            if self.texts[doc_id] == texts:
+                return
+            self.mids[doc_id] = None
+            self.texts[doc_id] = None
+
+        doc_id = len(self.mids)
+        self.mids.append(mid)
+        self.texts.append(texts)
+        self.doc_by_mid[mid] = doc_id
+        for term in terms:
+            posting = self.postings.get(term)
+            if posting is None:
+                posting = self.postings[term] = array("I")
+            posting.append(doc_id)
+
+    def compacted(self) -> "_IndexState":
+        """丢弃墓碑文档后的新索引（保持新旧顺序）"""
+        state = _IndexState()
+        for mid, texts in zip(self.mids, self.texts):
+            if mid is not None:
+                state.add(mid, texts, _doc_terms(texts))
+        return state
+
+    def candidates(self, tokens: list[str]) -> Iterable[int]:
+        """按各词的 n-gram 倒排表求交集，由新到旧产出文档编号；调用方凑够候选即停止"""
+        postings = []
+        for token in tokens:
+            for gram in _query_grams(token):
+                posting = self.postings.get(gram)
+                if posting is None:
+                    return ()
+                postings.append(posting)
+        if len(postings) == 1:
+            return reversed(postings[0])
+        postings.sort(key=len)
+        return _intersect_newest_first(postings[0], postings[1:])
+
+
+class LocalSongIndex:
+    """检索读当前索引；写入先登记到待合入队列，由后台任务在锁外计算文本与 n-gram 后短暂持锁追加
+
+    启动重建与墓碑压缩都在锁外生成新索引后整体替换，检索不会被长时间阻塞（只有后台任务会修改索引）
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = _IndexState()
+        self._pending: list[tuple[str, str, str, str]] = []
+        self._wakeup = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._state.doc_by_mid)
+
+    def submit(self, items: list[SongItem]) -> None:
+        """登记待索引歌曲并唤醒后台任务，不阻塞调用方（需在事件循环线程调用）"""
+        self._pending.extend(
+            (item.songMid, item.songName, item.singer, item.album.albumName) for item in items if item.songMid
+        )
+        if self._pending:
+            self._wakeup.set()
+
+    def search(self, query: str, limit: int = 50) -> list[str]:
+        """空白分隔的每个词都须命中标题/歌手/专辑之一（原文、拼音全拼或首字母的子串），按命中字段与位置排序，返回 mid"""
+        tokens = _normalize(query).replace(_FORM_SEPARATOR, " ").split()
+        if not tokens:
+            return []
+
+        with self._lock:
+            state = self._state
+            pool_size = max(limit * 4, MIN_RANK_POOL)
+            scored = []
+            for doc_id in state.candidates(tokens):
+                texts = state.texts[doc_id]
+                if texts is None:
+                    continue
+                score = _score(texts, tokens)
+                if score:
+                    scored.append((score, doc_id))
+                    if len(scored) >= pool_size:
+                        break
+            return [state.mids[doc_id] for _, doc_id in heapq.nlargest(limit, scored)]
+
+    def rebuild(self, songs: list[tuple[str, str, str, str]]) -> None:
+        """按 (mid, 标题, 歌手, 专辑)（由旧到新）在锁外重建索引后整体替换"""
+        state = _IndexState()
+        for mid, *fields in songs:
+            texts = _song_texts(*fields)
+            state.add(mid, texts, _doc_terms(texts))
+        with self._lock:
+            self._state = state
+
+    def add_songs(self, songs: list[tuple[str, str, str, str]]) -> None:
+        """合入一批歌曲：锁外计算可检索文本与 n-gram，持锁只追加倒排表；墓碑过多时压缩"""
+        prepared = []
+        for mid, *fields in songs:
+            texts = _song_texts(*fields)
+            prepared.append((mid, texts, _doc_terms(texts)))
+        with self._lock:
+            for mid, texts, terms in prepared:
+                self._state.add(mid, texts, terms)
+        state = self._state
+        if state.tombstones > max(len(state.doc_by_mid) // 4, 1000):
+            compacted = state.compacted()
+            with self._lock:
+                self._state = compacted
+
+    async def run(self) -> None:
+        """后台任务：启动时由元数据库重建索引，之后批量合入排队的歌曲"""
+        songs = await asyncio.to_thread(song_metadata_store.list_index_fields)
+        await asyncio.to_thread(self.rebuild, songs)
+        logger.info(f"本地搜索索引已重建: songs={len(self)}")
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            batch, self._pending = self._pending, []
+            try:
+                await asyncio.to_thread(self.add_songs, batch)
+            except Exception:
+                logger.warning(f"写入本地搜索索引失败: count={len(batch)}", exc_info=True)
+
+
+"""辅助函数"""
+
+
+def _normalize(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", text or "").casefold().split())
+
+
+@lru_cache(maxsize=65536)
+def _searchable_forms(text: str) -> tuple[str, ...]:
+    """字段的可检索形式：归一化原文，含汉字时追加拼音全拼与首字母（去空白标点）"""
+    normalized = _normalize(text)
+    if not normalized:
+        return ()
+    if not _CJK_RUN.search(normalized):
+        return (normalized,)
+
+    full, initials = [], []
+    position = 0
+    for match in _CJK_RUN.finditer(normalized):
+        words = _WORD.findall(normalized[position : match.start()])
+        full.extend(words)
+        initials.extend(word[0] for word in words)
+        syllables = lazy_pinyin(match.group())
+        full.extend(syllables)
+        initials.extend(syllable[0] for syllable in syllables if syllable)
+        position = match.end()
+    words = _WORD.findall(normalized[position:])
+    full.extend(words)
+    initials.extend(word[0] for word in words)
+    return (normalized, "".join(full), "".join(initials))
+
+
+def _song_texts(song_name: str, singer: str, album_name: str) -> tuple[tuple[int, str], ...]:
+    """(字段权重, 以分隔符拼接的全部可检索形式) 列表，按标题/歌手/专辑即权重降序排列，空字段省略"""
+    fields = (song_name, singer, album_name)
+    return tuple(
+        (weight, _FORM_SEPARATOR.join(forms))
+        for weight, forms in zip(_FIELD_WEIGHTS, map(_searchable_forms, fields))
+        if forms
+    )
+
+
+def _doc_terms(texts) -> set[str]:
+    """文档的全部 1~3-gram（不跨越字段与形式边界）"""
+    terms = set()
+    for _, joined in texts:
+        for form in joined.split(_FORM_SEPARATOR):
+            for n in (1, 2, 3):
+                terms.update(form[i : i + n] for i in range(len(form) - n + 1))
+    return terms
+
+
+def _intersect_newest_first(shortest: array, others: list[array]) -> Iterator[int]:
+    """从最短倒排表末尾起逐块（块长翻倍）与其余倒排表的对应区间求交（块内候选为空即跳过后续倒排表），由新到旧产出
+
+    倒排表均按文档编号递增，各表只需二分出本块下界，整体每个元素最多访问一次；宽泛查询凑够候选后不再继续
+    """
+    bounds = [len(posting) for posting in others]
+    end = len(shortest)
+    block_size = INTERSECT_FIRST_BLOCK
+    while end > 0:
+        start = max(end - block_size, 0)
+        block_size *= 2
+        low = shortest[start]
+        block = set(shortest[start:end])
+        for index, posting in enumerate(others):
+            lower = bisect_left(posting, low, 0, bounds[index])
+            if len(block) * PROBE_COST_FACTOR < bounds[index] - lower:
+                block = {doc_id for doc_id in block if _contains(posting, doc_id)}
+            else:
+                block.intersection_update(posting[lower : bounds[index]])
+            bounds[index] = lower
+            if not block:
+                break
+        yield from sorted(block, reverse=True)
+        end = start
+
+
+def _contains(posting: array, doc_id: int) -> bool:
+    position = bisect_left(posting, doc_id)
+    return position < len(posting) and posting[position] == doc_id
+
+
+def _query_grams(token: str) -> list[str]:
+    """查询词切为首尾相接的 3-gram（最后一段与末尾对齐），候选再经子串校验"""
+    if len(token) <= 3:
+        return [token]
+    starts = list(range(0, len(token) - 2, 3))
+    if starts[-1] != len(token) - 3:
+        starts.append(len(token) - 3)
+    return [token[i : i + 3] for i in starts]
+
+
+def _score(texts, tokens) -> int:
+    """每个词取命中字段的最高权重（前缀命中加 1），任一词未命中返回 0"""
+    total = 0
+    for token in tokens:
+        best = 0
+        for weight, joined in texts:
+            # 后续字段权重不更高，至多追平当前得分
+            if weight < best:
+                break
+            position = joined.find(token)
+            if position < 0:
+                continue
+            if position == 0 or joined[position - 1] == _FORM_SEPARATOR or _FORM_SEPARATOR + token in joined:
+                best = weight + 1
+                break
+            best = weight
+        if not best:
+            return 0
+        total += best
+    if len(tokens) == 1 and texts and texts[0][0] == _FIELD_WEIGHTS[0]:
+        title = texts[0][1]
+        if title == tokens[0] or title.startswith(tokens[0] + _FORM_SEPARATOR):
+            total += 5
+    return total
+
+
+local_song_index = LocalSongIndex()
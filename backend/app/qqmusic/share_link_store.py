@@ -0,0 +1,64 @@
+"""分享短链持久化缓存：短链 → (类型, ID) 的映射长期不变，解析过的链接再次搜索或翻页时跳过重定向请求"""
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from app.core.paths import SHARE_LINK_CACHE_PATH
+from app.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+SHARE_LINK_MAX_ENTRIES = 5000
+
+
+class ShareLinkStore:
+    """首次使用时整体读入内存（按最近使用排序），新增链接时整体原子写回；超出容量淘汰最久未用的链接"""
+
+    def __init__(self, path, max_entries: int = SHARE_LINK_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[str, int]] | None = None
+
+    def get(self, url: str) -> tuple[str, int] | None:
+        with self._lock:
+            entries = self._ensure_loaded()
+            entry = entries.get(url)
+            if entry is not None:
+                entries.move_to_end(url)
+            return entry
+
+    def put(self, url: str, url_type: str, resource_id: int) -> None:
+        with self._lock:
+            entries = self._ensure_loaded()
+            entries[url] = (url_type, resource_id)
+            entries.move_to_end(url)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+            payload = json.dumps(
+                [[link, link_type, link_id] for link, (link_type, link_id) in entries.items()], ensure_ascii=False
+            )
+            os.makedirs(self.path.parent, exist_ok=True)
+            tmp_path = self.path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                file.write(payload)
+            os.replace(tmp_path, self.path)
+
+    def _ensure_loaded(self) -> OrderedDict[str, tuple[str, int]]:
+        """需持锁调用；文件缺失或损坏时从空缓存开始"""
+        if self._entries is None:
+            self._entries = OrderedDict()
+            try:
+                with open(self.path, "r", encoding="utf-8") as file:
+                    rows = json.load(file)
+                for link, link_type, link_id in rows:
+                    self._entries[str(link)] = (str(link_type), int(link_id))
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError, TypeError):
+                logger.warning(f"分享链接缓存损坏，已忽略: path={self.path}")
+        return self._entries
+
+
+share_link_store = ShareLinkStore(SHARE_LINK_CACHE_PATH)
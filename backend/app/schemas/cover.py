@@ -0,0 +1,45 @@
+"""专辑封面代理数据模型"""
+from pydantic import BaseModel, Field
+
+
+class CoverPrefetchRequest(BaseModel):
+    requestId: str = Field(default="0", description="请求 ID")
+    albumMidList: list[str] = Field(default_factory=list, max_length=2000, description="专辑 MID 列表")
+    playlistId: int = Field(default=0, description="歌单 ID；非 0 时预取该歌单全部歌曲的专辑封面（与 albumMidList 合并）")
+
+
+class CoverPrefetchResponse(BaseModel):
+    requestId: str = Field(default="", description="请求 ID")
+    total: int = Field(default=0, description="去重后的专辑数")
+    cached: int = Field(default=0, description="已在本地缓存的专辑数")
+    scheduled: int = Field(default=0, description="新加入后台预取的专辑数")
+
+
+class AlbumPaletteRequest(BaseModel):
+    requestId: str = Field(default="0", description="请求 ID")
+    albumMid: str = Field(..., min_length=1, description="专辑 MID")
+
+
+class AlbumPaletteBatchRequest(BaseModel):
+    requestId: str = Field(default="0", description="请求 ID")
+    albumMidList: list[str] = Field(default_factory=list, max_length=2000, description="专辑 MID 列表")
+    playlistId: int = Field(default=0, description="歌单 ID；非 0 时取该歌单全部歌曲的专辑配色（与 albumMidList 合并）")
+
+
+class PaletteSwatch(BaseModel):
+    color: str = Field(default="", description="颜色 #rrggbb")
+    population: float = Field(default=0, description="占采样像素的比例")
+
+
+class AlbumPaletteResponse(BaseModel):
+    albumMid: str = Field(default="", description="专辑 MID")
+    dominant: str = Field(default="", description="主色（像素最多的颜色）#rrggbb")
+    vibrant: str = Field(default="", description="鲜艳色（高饱和、中等亮度），无合适颜色时同主色")
+    muted: str = Field(default="", description="柔和色（低饱和、中等亮度），无合适颜色时同主色")
+    swatches: list[PaletteSwatch] = Field(default_factory=list, description="占比最高的若干颜色（按占比降序）")
+
+
+class AlbumPaletteBatchResponse(BaseModel):
+    requestId: str = Field(default="", description="请求 ID")
+    result: list[AlbumPaletteResponse] = Field(default_factory=list, description="专辑配色（按请求顺序去重，不含失败项）")
+    failed: list[str] = Field(default_factory=list, description="封面获取失败的专辑 MID")
@@ -0,0 +1,41 @@
+"""后台下载任务数据模型"""
+from typing import Literal
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from app.schemas.qqmusic import SongDownloadBundleResponse
+
+DownloadJobStatus = Literal["queued", "downloading", "completed", "failed", "cancelled"]
+
+
+class DownloadTaskItem(BaseModel):
+    songMid: str = Field(..., min_length=1, description="歌曲 MID")
+    targetDir: str = Field(..., min_length=1, description="保存目录（绝对路径）")
+    fileName: str = Field(default="", max_length=200, description="文件名（不含扩展名），为空时使用“歌手 - 歌名”")
+
+
+class DownloadJobCreateRequest(BaseModel):
+    """批量创建下载任务请求"""
+    items: list[DownloadTaskItem] = Field(..., min_length=1, max_length=500, description="下载任务列表")
+
+
+class DownloadJobInfo(BaseModel):
+    """下载任务状态"""
+    jobId: str = Field(default="", description="任务 ID")
+    songMid: str = Field(default="", description="歌曲 MID")
+    status: DownloadJobStatus = Field(default="queued", description="任务状态")
+    filePath: str = Field(default="", description="保存路径（解析下载链接后确定）")
+    totalBytes: int = Field(default=0, description="文件总字节数，0 表示未知")
+    downloadedBytes: int = Field(default=0, description="已下载字节数")
+    segments: int = Field(default=0, description="并行分段数")
+    errorCode: int = Field(default=0, description="失败时的错误码")
+    error: str = Field(default="", description="失败原因")
+    bundle: SongDownloadBundleResponse | None = Field(default=None, description="下载元数据包（供写入标签）")
+    createdAt: int = Field(default=0, description="创建时间（Unix 秒）")
+    updatedAt: int = Field(default=0, description="最近更新时间（Unix 秒）")
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class DownloadJobListResponse(BaseModel):
+    jobs: list[DownloadJobInfo] = Field(default_factory=list, description="下载任务列表（按创建顺序）")
@@ -41,6 +41,28 @@ class SongItem(BaseModel):
     songUrl: SongUrlInfo | None = Field(default=None, description="歌曲播放链接")
 
 
+class LocalTrackInfo(BaseModel):
+    """待匹配的本地音轨（通常来自文件标签）"""
+    title: str = Field(..., min_length=1, max_length=200, description="标题")
+    artist: str = Field(default="", max_length=200, description="歌手，多位歌手可用 / & , 分隔")
+    duration: float = Field(default=0, ge=0, description="时长（秒），0 表示未知")
+
+
+class LyricWord(BaseModel):
+    text: str = Field(default="", description="字/词文本")
+    startMs: int = Field(default=0, description="起始时间（毫秒）")
+    durationMs: int = Field(default=0, description="持续时间（毫秒）")
+
+
+class LyricLine(BaseModel):
+    timeMs: int = Field(default=0, description="行起始时间（毫秒）")
+    durationMs: int = Field(default=0, description="行持续时间（毫秒），0 表示未知")
+    text: str = Field(default="", description="原文")
+    trans: str = Field(default="", description="翻译")
+    roma: str = Field(default="", description="音译")
+    words: list[LyricWord] = Field(default_factory=list, description="逐字时间，上游无逐字歌词时为空")
+
+
 # ========== 请求类（Request）==========
 
 
@@ -60,6 +82,18 @@ class AlbumImgRequest(BaseModel):
 class SongUrlRequest(BaseModel):
     requestId: str = Field(default="0", description="请求 ID 用于跟踪")
     songIdList: list[str] = Field(..., max_length=200, description="歌曲 MID 列表")
+    maxQuality: Literal["flac", "ogg_320", "mp3_320", "mp3_128", "acc_96"] = Field(
+        default="flac", description="音质上限，按 flac → ogg_320 → mp3_320 → mp3_128 → acc_96 逐级降级"
+    )
+
+
+class PlayQueueRequest(BaseModel):
+    """播放队列登记请求，后端按顺序预取当前曲目起的若干首链接"""
+    songIdList: list[str] = Field(..., max_length=1000, description="播放队列歌曲 MID 列表（按播放顺序）")
+    currentIndex: int = Field(default=0, ge=0, description="当前播放曲目在队列中的下标")
+    maxQuality: Literal["flac", "ogg_320", "mp3_320", "mp3_128", "acc_96"] = Field(
+        default="flac", description="预取音质上限，需与播放时请求 /song/song-url 的 maxQuality 一致"
+    )
 
 
 class KeywordSearchRequest(BaseModel):
@@ -69,11 +103,41 @@ class KeywordSearchRequest(BaseModel):
     pageSize: int = Field(default=10, ge=1, le=50, description="每页数量")
 
 
+class BatchKeywordSearchRequest(BaseModel):
+    requestId: str = Field(default="0", description="请求 ID 用于跟踪")
+    keywords: list[str] = Field(..., min_length=1, max_length=2000, description="关键词列表")
+    pageSize: int = Field(default=5, ge=1, le=50, description="每个关键词返回的结果数")
+    format: Literal["ndjson", "sse"] = Field(default="ndjson", description="流格式")
+
+
+class TrackMatchRequest(BaseModel):
+    requestId: str = Field(default="0", description="请求 ID 用于跟踪")
+    tracks: list[LocalTrackInfo] = Field(..., min_length=1, max_length=2000, description="本地音轨列表")
+    format: Literal["ndjson", "sse"] = Field(default="ndjson", description="流格式")
+
+
+class LocalSearchRequest(BaseModel):
+    requestId: str = Field(default="0", description="请求 ID 用于跟踪")
+    keyword: str = Field(..., max_length=100, description="关键词（支持拼音全拼与首字母，空格分隔多个词）")
+    limit: int = Field(default=50, ge=1, le=200, description="最多返回条数")
+
+
+class SuggestRequest(BaseModel):
+    requestId: str = Field(default="0", description="请求 ID 用于跟踪")
+    keyword: str = Field(..., max_length=100, description="当前输入")
+    sessionKey: str = Field(default="", max_length=64, description="输入会话标识；同一会话的新请求会取消旧的在途请求")
+
+
 class GetUserLikedRequest(BaseModel):
     page: int = Field(default=1, ge=1, description="页码")
     pageSize: int = Field(default=20, ge=1, le=100, description="每页数量")
 
 
+class LikedAllSongsRequest(BaseModel):
+    requestId: str = Field(default="0", description="请求 ID 用于跟踪")
+    refresh: bool = Field(default=False, description="是否丢弃缓存重新拉取")
+
+
 class GetPlaylistSongsRequest(BaseModel):
     requestId: str = Field(default="0", description="请求 ID 用于跟踪")
     page: int = Field(default=1, ge=1, description="页码")
@@ -82,6 +146,12 @@ class GetPlaylistSongsRequest(BaseModel):
 
 class PlaylistAllSongsRequest(BaseModel):
     requestId: str = Field(default="0", description="请求 ID 用于跟踪")
+    parallel: bool = Field(default=True, description="是否并发拉取分页；False 时逐页顺序拉取")
+
+
+class PlaylistSyncRequest(BaseModel):
+    requestId: str = Field(default="0", description="请求 ID 用于跟踪")
+    sinceVersion: str = Field(default="", description="客户端已缓存的歌单版本；为空或已过期时返回全量")
 
 
 class CheckQRCodeRequest(BaseModel):
@@ -94,6 +164,23 @@ class SongDownloadBundleRequest(BaseModel):
     songMid: str = Field(..., description="歌曲 MID")
 
 
+class LyricsRequest(BaseModel):
+    requestId: str = Field(default="0", description="请求 ID")
+    songMid: str = Field(..., description="歌曲 MID")
+
+
+class LyricsPrefetchRequest(BaseModel):
+    requestId: str = Field(default="0", description="请求 ID")
+    songMidList: list[str] = Field(default_factory=list, max_length=2000, description="歌曲 MID 列表")
+    playlistId: int = Field(default=0, description="歌单 ID；非 0 时预取该歌单全部歌曲（与 songMidList 合并）")
+
+
+class SongDownloadBundleBatchRequest(BaseModel):
+    """批量歌曲下载元数据包请求"""
+    requestId: str = Field(default="0", description="请求 ID")
+    songMidList: list[str] = Field(..., min_length=1, max_length=200, description="歌曲 MID 列表")
+
+
 # ========== 响应类（Response）==========
 
 
@@ -107,6 +194,7 @@ class UserPlaylistsResponse(BaseModel):
 class LikedSongsResponse(BaseModel):
     result: list[SongItem] = Field(default_factory=list, description="用户喜欢的歌曲列表")
     total: int = Field(default=0, description="歌曲总数")
+    failedPages: list[int] = Field(default_factory=list, description="拉取失败的页码（全量拉取时）")
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -115,10 +203,40 @@ class PlaylistSongsResponse(BaseModel):
     result: list[SongItem] = Field(default_factory=list, description="歌单歌曲列表")
     total: int = Field(default=0, description="歌曲总数")
     requestId: str = Field(default="", description="请求 ID")
+    failedPages: list[int] = Field(default_factory=list, description="拉取失败的页码（全量拉取时）")
 
     model_config = ConfigDict(from_attributes=True)
 
 
+class PlaylistInsertedEntry(BaseModel):
+    index: int = Field(..., description="在新歌单中的位置")
+    song: SongItem = Field(..., description="新增歌曲元数据")
+
+
+class PlaylistRemovedEntry(BaseModel):
+    index: int = Field(..., description="在旧歌单中的位置")
+    songMid: str = Field(default="", description="歌曲 MID")
+
+
+class PlaylistMovedEntry(BaseModel):
+    fromIndex: int = Field(..., description="在旧歌单中的位置")
+    toIndex: int = Field(..., description="在新歌单中的位置")
+    songMid: str = Field(default="", description="歌曲 MID")
+
+
+class PlaylistSyncResponse(BaseModel):
+    """歌单增量同步结果：full=True 时 result 为全量歌曲，否则按 inserted/removed/moved 更新旧列表"""
+    requestId: str = Field(default="", description="请求 ID")
+    version: str = Field(default="", description="当前歌单版本（有序 MID 内容哈希）")
+    baseVersion: str = Field(default="", description="差异所基于的客户端版本")
+    full: bool = Field(default=False, description="是否返回全量")
+    total: int = Field(default=0, description="歌曲总数")
+    result: list[SongItem] = Field(default_factory=list, description="全量歌曲（仅 full=True）")
+    inserted: list[PlaylistInsertedEntry] = Field(default_factory=list, description="新增歌曲")
+    removed: list[PlaylistRemovedEntry] = Field(default_factory=list, description="删除歌曲")
+    moved: list[PlaylistMovedEntry] = Field(default_factory=list, description="移动歌曲")
+
+
 class SearchResponse(BaseModel):
     result: list[SongItem] = Field(default_factory=list, description="搜索结果列表")
     total: int = Field(default=0, description="结果总数")
@@ -127,6 +245,13 @@ class SearchResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class SuggestResponse(BaseModel):
+    requestId: str = Field(default="", description="请求 ID")
+    keyword: str = Field(default="", description="对应的输入")
+    suggestions: list[str] = Field(default_factory=list, description="补全建议")
+    superseded: bool = Field(default=False, description="是否已被同一会话的新请求取代（此时建议为空）")
+
+
 class AlbumImgResponse(BaseModel):
     requestId: str = Field(default="", description="请求 ID")
     result: list[str] = Field(default_factory=list, description="封面 URL 列表")
@@ -137,6 +262,9 @@ class AlbumImgResponse(BaseModel):
 class SongUrlItem(BaseModel):
     url: str = Field(default="", description="歌曲 URL")
     urlType: str = Field(default="mp3", description="音频格式: mp3/flac")
+    expiresAt: int = Field(default=0, description="链接过期时间（Unix 秒），0 表示未知")
+    quality: str = Field(default="", description="协商得到的音质: flac/ogg_320/mp3_320/mp3_128/acc_96")
+    bitrate: int = Field(default=0, description="标称码率（kbps）")
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -148,6 +276,13 @@ class SongUrlResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class PlayQueueResponse(BaseModel):
+    total: int = Field(default=0, description="登记的队列长度")
+    prefetchCount: int = Field(default=0, description="进入预取窗口的歌曲数")
+
+    model_config = ConfigDict(from_attributes=True)
+
+
 class SongDownloadBundleResponse(BaseModel):
     """歌曲下载元数据包，平台无关，各平台 Service 填充对应字段"""
     songMid: str = Field(default="", description="歌曲 MID")
@@ -162,3 +297,71 @@ class SongDownloadBundleResponse(BaseModel):
     songUrl: SongUrlInfo = Field(default_factory=SongUrlInfo, description="歌曲下载链接")
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class LyricsResponse(BaseModel):
+    requestId: str = Field(default="", description="请求 ID")
+    songMid: str = Field(default="", description="歌曲 MID")
+    lyric: str = Field(default="", description="LRC 歌词原文")
+    trans: str = Field(default="", description="LRC 翻译")
+    roma: str = Field(default="", description="LRC 音译")
+
+
+class StructuredLyricsResponse(BaseModel):
+    requestId: str = Field(default="", description="请求 ID")
+    songMid: str = Field(default="", description="歌曲 MID")
+    lines: list[LyricLine] = Field(default_factory=list, description="按起始时间升序的歌词行")
+    hasTranslation: bool = Field(default=False, description="是否含翻译")
+    hasRoma: bool = Field(default=False, description="是否含音译")
+    hasWordTiming: bool = Field(default=False, description="是否含逐字时间")
+
+
+class LyricsPrefetchResponse(BaseModel):
+    requestId: str = Field(default="", description="请求 ID")
+    total: int = Field(default=0, description="去重后的歌曲数")
+    cached: int = Field(default=0, description="已在本地缓存的歌曲数")
+    scheduled: int = Field(default=0, description="新加入后台预取的歌曲数")
+
+
+class SongDownloadBundleBatchItem(BaseModel):
+    songMid: str = Field(default="", description="歌曲 MID")
+    code: int = Field(default=0, description="0 表示成功，其余为错误码")
+    message: str = Field(default="success", description="错误信息")
+    bundle: SongDownloadBundleResponse | None = Field(default=None, description="下载元数据包，失败时为空")
+
+
+class SongDownloadBundleBatchResponse(BaseModel):
+    requestId: str = Field(default="", description="请求 ID")
+    result: list[SongDownloadBundleBatchItem] = Field(default_factory=list, description="按请求顺序的下载元数据包")
+    failed: int = Field(default=0, description="失败数量")
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class CoalesceStats(BaseModel):
+    hits: int = Field(default=0, description="复用在途请求次数")
+    misses: int = Field(default=0, description="实际发往上游次数")
+    inflight: int = Field(default=0, description="当前在途请求数")
+
+
+class CacheStats(BaseModel):
+    hits: int = Field(default=0, description="命中次数")
+    misses: int = Field(default=0, description="未命中次数")
+    size: int = Field(default=0, description="当前条目数")
+
+
+class CdnHostStats(BaseModel):
+    host: str = Field(default="", description="CDN 节点")
+    scoreMs: int | None = Field(default=None, description="延迟滑动平均得分（毫秒），越低越优先")
+    connectMs: int | None = Field(default=None, description="最近一次连接耗时（毫秒）")
+    firstByteMs: int | None = Field(default=None, description="最近一次首字节耗时（毫秒）")
+    failures: int = Field(default=0, description="累计失败次数")
+
+
+class BackendStatsResponse(BaseModel):
+    """后端运行统计"""
+    requestCoalescing: CoalesceStats = Field(default_factory=CoalesceStats, description="上游请求合并统计")
+    cdnHosts: list[CdnHostStats] = Field(default_factory=list, description="CDN 节点按得分排序")
+    searchCache: CacheStats = Field(default_factory=CacheStats, description="关键词搜索缓存统计")
+
+    model_config = ConfigDict(from_attributes=True)
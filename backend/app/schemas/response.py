@@ -1,6 +1,11 @@
 """统一响应构造器"""
+import hashlib
+import json
 from typing import TypeVar
 
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+
 from app.schemas.common import ErrorCode
 
 T = TypeVar("T")
@@ -16,3 +21,41 @@ def error(
     data: T | None = None,
 ) -> dict:
     return {"code": code, "message": message, "data": data}
+
+
+def conditional_success(data: T | None = None, if_none_match: str | None = None, message: str = "success") -> Response:
+    """带 ETag 的成功响应：内容哈希命中 If-None-Match 时返回 304 空响应"""
+    content = jsonable_encoder(success(data=data, message=message))
+    etag = _content_etag(content)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if if_none_match and _etag_matches(etag, if_none_match):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=content, headers=headers)
+
+
+def cached_bytes_response(
+    content: bytes, media_type: str, etag: str, if_none_match: str | None = None, max_age: int = 31536000
+) -> Response:
+    """内容不变的二进制资源响应（如封面图片）：长期缓存，ETag 命中 If-None-Match 时返回 304 空响应"""
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={max_age}, immutable"}
+    if if_none_match and _etag_matches(etag, if_none_match):
+        return Response(status_code=304, headers=headers)
+    return Response(content=content, media_type=media_type, headers=headers)
+
+
+def _content_etag(content: dict) -> str:
+    """对响应体做稳定哈希；requestId 每次请求都不同，不参与计算"""
+    data = content.get("data")
+    if isinstance(data, dict) and "requestId" in data:
+        content = {**content, "data": {key: value for key, value in data.items() if key != "requestId"}}
+    raw = json.dumps(content, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return f'"{hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]}"'
+
+
+def _etag_matches(etag: str, if_none_match: str) -> bool:
+    """If-None-Match 按弱比较匹配（忽略 W/ 前缀），支持多值与 *"""
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
@@ -0,0 +1,276 @@
+"""在线音频流代理：按 HTTP Range 分块回源，已获取的字节块落盘缓存（容量有界、LRU 淘汰）"""
+import asyncio
+import json
+import os
+import re
+import threading
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import httpx
+
+from app.core.config import settings
+from app.core.paths import AUDIO_CACHE_DIR
+from app.qqmusic.cdn import cdn_selector
+from app.qqmusic.http_client import get_media_client
+from app.qqmusic.ids import MID_PATTERN
+from app.schemas.common import ErrorCode
+from app.services.qqmusic import get_song_url_list_v2
+from app.utils.disk_cache import DiskLRUStore
+from app.utils.exception import ServiceException
+from app.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+CHUNK_SIZE = 512 * 1024
+UPSTREAM_TIMEOUT_SECONDS = 15
+CONTENT_RANGE_PATTERN = re.compile(r"bytes\s+(\d+)-(\d+)/(\d+)")
+_CONTENT_TYPES = {"flac": "audio/flac", "ogg": "audio/ogg", "mp3": "audio/mpeg", "m4a": "audio/mp4"}
+
+
+class _RangeNotSatisfiable(Exception):
+    pass
+
+
+@dataclass
+class AudioStream:
+    """路由层据此构造流式响应"""
+    status_code: int
+    media_type: str
+    headers: dict[str, str]
+    body: AsyncIterator[bytes] | None = None
+
+
+@dataclass
+class _StreamMeta:
+    total: int
+    content_type: str
+    quality: str
+
+
+class _ChunkStore:
+    """磁盘字节块缓存：每首歌一个目录（meta.json + 定长块文件），总容量超限时按最近使用时间淘汰块"""
+
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = root
+        self._chunks = DiskLRUStore(root, max_bytes, "*/*.chunk")
+
+    def read_meta(self, key: str) -> _StreamMeta | None:
+        try:
+            with open(self.root / key / "meta.json", "r", encoding="utf-8") as file:
+                return _StreamMeta(**json.load(file))
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def write_meta(self, key: str, meta: _StreamMeta) -> None:
+        directory = self.root / key
+        os.makedirs(directory, exist_ok=True)
+        # 同一首歌的重叠 Range 请求可能并发写入，临时文件按线程区分
+        tmp_path = directory / f"meta.json.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(meta.__dict__, file)
+        os.replace(tmp_path, directory / "meta.json")
+
+    def read_chunk(self, key: str, index: int) -> bytes | None:
+        return self._chunks.read(f"{key}/{index}.chunk")
+
+    def write_chunk(self, key: str, index: int, data: bytes) -> None:
+        self._chunks.write(f"{key}/{index}.chunk", data)
+
+    def drop(self, key: str) -> None:
+        """删除整首歌的缓存（音源变化导致已缓存块失效时）"""
+        self._chunks.remove_dir(key)
+
+
+_store = _ChunkStore(AUDIO_CACHE_DIR, settings.audio_cache_max_mb * 1024 * 1024)
+
+
+async def open_song_stream(song_mid, range_header, max_quality="flac"):
+    """打开歌曲音频流：优先读磁盘块缓存，缺失的块经 get_song_url_list_v2 解析链接后按 Range 回源"""
+    if not MID_PATTERN.match(song_mid):
+        raise ServiceException(ErrorCode.PARAM_ERROR, "歌曲 MID 无效")
+
+    key = f"{song_mid}_{max_quality}"
+    resolver = _UrlResolver(song_mid, max_quality)
+
+    meta = await asyncio.to_thread(_store.read_meta, key)
+    if meta is None:
+        meta = await _init_stream_meta(key, resolver, _range_start_hint(range_header))
+
+    try:
+        byte_range = _parse_range(range_header, meta.total)
+    except _RangeNotSatisfiable:
+        return AudioStream(
+            status_code=416,
+            media_type=meta.content_type,
+            headers={"Content-Range": f"bytes */{meta.total}", "Accept-Ranges": "bytes"},
+        )
+
+    start, end = byte_range or (0, meta.total - 1)
+    headers = {"Accept-Ranges": "bytes", "Content-Length": str(end - start + 1)}
+    if byte_range is not None:
+        headers["Content-Range"] = f"bytes {start}-{end}/{meta.total}"
+
+    return AudioStream(
+        status_code=206 if byte_range is not None else 200,
+        media_type=meta.content_type,
+        headers=headers,
+        body=_iter_byte_range(key, meta, start, end, resolver),
+    )
+
+
+"""辅助函数"""
+
+
+@dataclass
+class _UrlResolver:
+    """单次流式响应内只解析一次上游链接"""
+    song_mid: str
+    max_quality: str
+    _item: object | None = field(default=None, init=False)
+
+    async def resolve(self):
+        if self._item is None:
+            response = await get_song_url_list_v2([self.song_mid], max_quality=self.max_quality)
+            item = response.result[0] if response.result else None
+            if item is None or not item.url:
+                raise ServiceException(ErrorCode.DATA_NOT_FOUND, "歌曲暂无可播放链接")
+            self._item = item
+        return self._item
+
+
+async def _init_stream_meta(key, resolver, start_hint):
+    """缓存中没有该歌曲时，回源拉取 Range 起点所在块，从 Content-Range 得到文件总长
+
+    起点超出文件末尾（上游 416）时改拉首块建立缓存，由调用方按文件总长返回 416
+    """
+    item = await resolver.resolve()
+    index = start_hint // CHUNK_SIZE
+    try:
+        chunks, total, content_type = await _fetch_upstream_chunk(item.url, index)
+    except _RangeNotSatisfiable:
+        if index == 0:
+            raise ServiceException(ErrorCode.AI_SERVICE_ERROR, "音频获取失败，请稍后重试")
+        chunks, total, content_type = await _fetch_upstream_chunk(item.url, 0)
+    meta = _StreamMeta(
+        total=total,
+        content_type=content_type or _CONTENT_TYPES.get(item.urlType, "application/octet-stream"),
+        quality=item.quality,
+    )
+    await _write_cache(key, chunks, meta)
+    return meta
+
+
+async def _iter_byte_range(key, meta, start, end, resolver):
+    """逐块产出 [start, end] 字节，缺失块回源后写入缓存"""
+    for index in range(start // CHUNK_SIZE, end // CHUNK_SIZE + 1):
+        data = await asyncio.to_thread(_store.read_chunk, key, index)
+        if data is None:
+            item = await resolver.resolve()
+            try:
+                chunks, total, _ = await _fetch_upstream_chunk(item.url, index)
+            except _RangeNotSatisfiable:
+                # 已校验过的范围在上游越界，说明音源变短
+                chunks, total = {}, None
+            if total != meta.total or item.quality != meta.quality:
+                # 音源已变化，旧块与新块不能拼接，清空缓存让下次请求重新建立；
+                # 响应头已承诺 Content-Length，抛异常中断连接，避免客户端把截断的响应当作成功
+                await asyncio.to_thread(_store.drop, key)
+                logger.error(f"音源已变化，中止音频流: key={key}")
+                raise ServiceException(ErrorCode.AI_SERVICE_ERROR, "音源已变化，请重新播放")
+            await _write_cache(key, chunks)
+            data = chunks[index]
+
+        chunk_start = index * CHUNK_SIZE
+        yield data[max(start - chunk_start, 0) : end - chunk_start + 1]
+
+
+async def _write_cache(key, chunks, meta=None):
+    """回源数据写入磁盘缓存；写入失败只记日志，不影响已开始的音频流"""
+    try:
+        if meta is not None:
+            await asyncio.to_thread(_store.write_meta, key, meta)
+        for chunk_index, data in chunks.items():
+            await asyncio.to_thread(_store.write_chunk, key, chunk_index, data)
+    except OSError as exc:
+        logger.warning(f"音频缓存写入失败: key={key} error={exc}")
+
+
+async def _fetch_upstream_chunk(url, index):
+    """按块回源，返回 (块下标 → 字节, 文件总长, Content-Type)；上游不支持 Range 时整文件切块，块起点越界抛 _RangeNotSatisfiable"""
+    chunk_start = index * CHUNK_SIZE
+    headers = {"Range": f"bytes={chunk_start}-{chunk_start + CHUNK_SIZE - 1}"}
+    response = None
+    # 连接失败或节点 5xx 时按得分切换到其他 CDN 节点
+    for candidate in cdn_selector.candidate_urls(url):
+        try:
+            response = await get_media_client().get(candidate, headers=headers, timeout=UPSTREAM_TIMEOUT_SECONDS)
+        except httpx.HTTPError as exc:
+            logger.warning(f"音频回源失败: index={index} error={exc}")
+            cdn_selector.report_failure(candidate)
+            continue
+        if response.status_code < 500:
+            break
+        cdn_selector.report_failure(candidate)
+
+    if response is None:
+        raise ServiceException(ErrorCode.AI_SERVICE_ERROR, "音频获取失败，请稍后重试")
+
+    content_type = response.headers.get("content-type", "").split(";")[0].strip()
+    if content_type in ("", "application/octet-stream", "text/plain"):
+        content_type = ""
+
+    if response.status_code == 206:
+        match = CONTENT_RANGE_PATTERN.match(response.headers.get("content-range", ""))
+        if match is None or int(match.group(1)) != chunk_start:
+            raise ServiceException(ErrorCode.AI_SERVICE_ERROR, "音频源响应范围异常")
+        return {index: response.content}, int(match.group(3)), content_type
+
+    if response.status_code == 200:
+        body = response.content
+        chunks = {i // CHUNK_SIZE: body[i : i + CHUNK_SIZE] for i in range(0, len(body), CHUNK_SIZE)}
+        if index not in chunks:
+            raise _RangeNotSatisfiable()
+        return chunks, len(body), content_type
+
+    if response.status_code == 416:
+        raise _RangeNotSatisfiable()
+
+    logger.error(f"音频回源状态异常: index={index} status={response.status_code}")
+    raise ServiceException(ErrorCode.AI_SERVICE_ERROR, "音频获取失败，请稍后重试")
+
+
+def _range_start_hint(range_header):
+    """在文件总长未知时粗略取 Range 起点，用于决定首个回源块"""
+    match = re.match(r"\s*bytes\s*=\s*(\d+)-", range_header or "")
+    return int(match.group(1)) if match else 0
+
+
+def _parse_range(range_header, total):
+    """解析单段 Range 头，返回闭区间 (start, end)；无 Range、语法无效或多段时返回 None 按整文件响应"""
+    if not range_header:
+        return None
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+
+    start_text, _, end_text = spec.strip().partition("-")
+    try:
+        if start_text == "":
+            length = int(end_text)
+            if length <= 0:
+                raise _RangeNotSatisfiable()
+            start, end = max(total - length, 0), total - 1
+        else:
+            start = int(start_text)
+            end = int(end_text) if end_text else None
+    except ValueError:
+        return None
+
+    # 起点大于终点属于无效 Range，按 RFC 9110 忽略并返回整文件
+    if end is not None and start > end:
+        return None
+    if start >= total:
+        raise _RangeNotSatisfiable()
+    return start, total - 1 if end is None else min(end, total - 1)
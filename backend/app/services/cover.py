@@ -0,0 +1,176 @@
+"""专辑封面代理：每张封面只回源一次（800 尺寸），缩放出 thumb/300 变体后落盘缓存（容量有界、LRU 淘汰）"""
+import asyncio
+import hashlib
+import io
+from dataclasses import dataclass
+
+import httpx
+from PIL import Image, UnidentifiedImageError
+
+from app.core.config import settings
+from app.core.paths import COVER_CACHE_DIR
+from app.qqmusic.http_client import get_media_client
+from app.qqmusic.ids import MID_PATTERN
+from app.schemas.common import ErrorCode
+from app.schemas.cover import CoverPrefetchResponse
+from app.services.qqmusic import get_songlist_detail_all
+from app.utils.disk_cache import DiskLRUStore
+from app.utils.exception import ServiceException
+from app.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+COVER_SOURCE_TEMPLATE = "https://y.gtimg.cn/music/photo_new/T002R800x800M000{mid}.jpg"
+# 尺寸名 → 最长边像素；800 直接保存回源原图
+COVER_SIZES = {"thumb": 150, "300": 300, "800": 800}
+SOURCE_SIZE = "800"
+JPEG_QUALITY = 85
+UPSTREAM_TIMEOUT_SECONDS = 15
+
+_fetching: dict[str, asyncio.Task] = {}
+_cover_prefetching: set[str] = set()
+_background_tasks: set[asyncio.Task] = set()
+
+
+@dataclass
+class CoverImage:
+    """路由层据此构造带 ETag 的图片响应"""
+    data: bytes
+    etag: str
+    media_type: str = "image/jpeg"
+
+
+# 目录结构：<mid 前两位>/<mid>/<尺寸>.jpg，按单个变体文件淘汰
+_store = DiskLRUStore(COVER_CACHE_DIR, settings.cover_cache_max_mb * 1024 * 1024, "*/*/*.jpg")
+
+
+async def get_cover(album_mid, size="300"):
+    """获取指定尺寸的专辑封面：磁盘缓存命中直接返回，否则回源一次生成全部尺寸变体"""
+    if not MID_PATTERN.match(album_mid or ""):
+        raise ServiceException(ErrorCode.PARAM_ERROR, "专辑 MID 无效")
+    if size not in COVER_SIZES:
+        raise ServiceException(ErrorCode.PARAM_ERROR, "封面尺寸无效")
+
+    data = await asyncio.to_thread(_store.read, _cover_path(album_mid, size))
+    if data is None:
+        variants = await _load_cover(album_mid)
+        data = variants[size]
+    return CoverImage(data=data, etag=f'"{hashlib.sha256(data).hexdigest()[:32]}"')
+
+
+async def prefetch_album_covers(album_mid_list, playlist_id=0, request_id=""):
+    """后台把封面预取到本地缓存（指定专辑与/或歌单全部歌曲的专辑），立即返回已缓存数与新排队数"""
+    mids = await collect_album_mids(album_mid_list, playlist_id, request_id)
+
+    cached = await asyncio.to_thread(lambda: {mid for mid in mids if _has_all_sizes(mid)})
+    pending = [mid for mid in mids if mid not in cached and mid not in _cover_prefetching]
+    if pending:
+        _cover_prefetching.update(pending)
+        task = asyncio.create_task(_prefetch_covers(pending))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+    logger.info(f"封面预取: total={len(mids)} cached={len(cached)} scheduled={len(pending)}")
+    return CoverPrefetchResponse(requestId=request_id, total=len(mids), cached=len(cached), scheduled=len(pending))
+
+
+async def collect_album_mids(album_mid_list, playlist_id=0, request_id=""):
+    """合并指定专辑与歌单全部歌曲的专辑，去重并过滤无效 MID（保持顺序）；结果为空时报参数错误"""
+    album_mid_list = list(album_mid_list)
+    if playlist_id:
+        detail = await get_songlist_detail_all(playlist_id, request_id=request_id, with_urls=False)
+        album_mid_list.extend(song.album.albumMid for song in detail.result)
+    mids = [mid for mid in dict.fromkeys(album_mid_list) if MID_PATTERN.match(mid or "")]
+    if not mids:
+        raise ServiceException(ErrorCode.PARAM_ERROR, "没有有效的专辑 MID")
+    return mids
+
+
+"""辅助函数"""
+
+
+async def _load_cover(album_mid):
+    """回源并生成全部尺寸变体；同一专辑的并发请求合并为一次回源"""
+    task = _fetching.get(album_mid)
+    if task is None:
+        task = asyncio.create_task(_fetch_cover(album_mid))
+        _fetching[album_mid] = task
+        task.add_done_callback(lambda _: _fetching.pop(album_mid, None))
+        # 所有请求方都已离开时无人 await，取走异常避免 "exception was never retrieved"
+        task.add_done_callback(lambda done: done.cancelled() or done.exception())
+    # 单个请求方断开不应取消其他请求方共享的回源
+    return await asyncio.shield(task)
+
+
+async def _fetch_cover(album_mid):
+    try:
+        response = await get_media_client().get(
+            COVER_SOURCE_TEMPLATE.format(mid=album_mid), timeout=UPSTREAM_TIMEOUT_SECONDS
+        )
+    except httpx.HTTPError as exc:
+        logger.warning(f"封面回源失败: album_mid={album_mid} error={exc}")
+        raise ServiceException(ErrorCode.AI_SERVICE_ERROR, "封面获取失败") from exc
+    if response.status_code == 404:
+        raise ServiceException(ErrorCode.DATA_NOT_FOUND, "专辑封面不存在")
+    if response.status_code != 200 or not response.content:
+        logger.warning(f"封面回源状态异常: album_mid={album_mid} status={response.status_code}")
+        raise ServiceException(ErrorCode.AI_SERVICE_ERROR, "封面获取失败")
+
+    variants = await asyncio.to_thread(_build_variants, response.content)
+    await asyncio.to_thread(_write_variants, album_mid, variants)
+    return variants
+
+
+def _cover_path(album_mid, size):
+    return f"{album_mid[:2]}/{album_mid}/{size}.jpg"
+
+
+def _has_all_sizes(album_mid):
+    return all(_store.exists(_cover_path(album_mid, size)) for size in COVER_SIZES)
+
+
+def _write_variants(album_mid, variants):
+    for size, data in variants.items():
+        _store.write(_cover_path(album_mid, size), data)
+
+
+def _build_variants(source):
+    """原图作为 800 变体，其余尺寸等比缩小后重新编码；原图无法解码时所有尺寸都使用原图"""
+    variants = {SOURCE_SIZE: source}
+    try:
+        image = Image.open(io.BytesIO(source))
+        image.load()
+    except (UnidentifiedImageError, OSError):
+        logger.warning("封面图片无法解码，所有尺寸使用原图")
+        return dict.fromkeys(COVER_SIZES, source)
+
+    image = image.convert("RGB")
+    for size, pixels in COVER_SIZES.items():
+        if size == SOURCE_SIZE:
+            continue
+        if max(image.size) <= pixels:
+            variants[size] = source
+            continue
+        resized = image.copy()
+        resized.thumbnail((pixels, pixels), Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        resized.save(buffer, format="JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+        variants[size] = buffer.getvalue()
+    return variants
+
+
+async def _prefetch_covers(album_mid_list):
+    """限流并发预取封面，单张失败只记日志"""
+    semaphore = asyncio.Semaphore(settings.cover_prefetch_concurrency)
+
+    async def prefetch_one(album_mid):
+        async with semaphore:
+            try:
+                await _load_cover(album_mid)
+            except Exception:
+                logger.warning(f"预取封面失败: album_mid={album_mid}")
+
+    try:
+        await asyncio.gather(*(prefetch_one(mid) for mid in album_mid_list))
+    finally:
+        _cover_prefetching.difference_update(album_mid_list)
@@ -0,0 +1,519 @@
+"""后台下载任务队列：按配置并发执行任务，单个文件按 HTTP Range 分段并行下载；任务与分段进度落盘，重启后断点续传"""
+import asyncio
+import json
+import math
+import os
+import re
+import time
+import uuid
+from contextlib import suppress
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+import httpx
+
+from app.core.config import settings
+from app.core.paths import DOWNLOAD_JOBS_PATH
+from app.qqmusic.cdn import cdn_selector
+from app.qqmusic.http_client import get_media_client
+from app.schemas.common import ErrorCode
+from app.schemas.download import DownloadJobInfo, DownloadJobListResponse
+from app.services import auth as services_auth
+from app.services.audio_stream import CONTENT_RANGE_PATTERN
+from app.services.qqmusic import get_song_download_bundle
+from app.utils.exception import ServiceException
+from app.utils.logger import setup_logger
+from app.utils.stream import encode_stream_events
+
+logger = setup_logger(__name__)
+
+CONNECT_TIMEOUT_SECONDS = 10
+READ_TIMEOUT_SECONDS = 30
+# 小于两段最小长度的文件不分段
+MIN_SEGMENT_BYTES = 1024 * 1024
+WRITE_BUFFER_BYTES = 256 * 1024
+# 每写入这么多字节 fsync 一次并记为已提交，续传从已提交位置开始
+CHECKPOINT_BYTES = 2 * 1024 * 1024
+SEGMENT_MAX_RETRIES = 3
+SAVE_INTERVAL_SECONDS = 2
+PROGRESS_INTERVAL_SECONDS = 0.5
+JOBS_FILE_VERSION = 1
+_ACTIVE_STATUSES = ("queued", "downloading")
+_UNSAFE_FILENAME_CHARS = re.compile(r'[\\/:*?"<>|\x00-\x1f]')
+_TIMEOUT = httpx.Timeout(READ_TIMEOUT_SECONDS, connect=CONNECT_TIMEOUT_SECONDS)
+
+
+class _SegmentError(Exception):
+    """分段下载可重试的异常（响应状态或长度不符）"""
+
+
+@dataclass
+class _Segment:
+    start: int
+    # 闭区间终点；不支持 Range 且总长未知时为 -1
+    end: int
+    committed: int = 0
+    written: int = 0
+
+    @property
+    def done(self) -> bool:
+        return self.end >= 0 and self.committed >= self.end - self.start + 1
+
+
+@dataclass
+class _Job:
+    jobId: str
+    songMid: str
+    targetDir: str
+    fileName: str
+    status: str = "queued"
+    createdAt: int = 0
+    updatedAt: int = 0
+    filePath: str = ""
+    totalBytes: int = 0
+    rangeSupported: bool = True
+    segments: list[_Segment] = field(default_factory=list)
+    errorCode: int = 0
+    error: str = ""
+    bundle: dict | None = None
+    revision: int = 0
+
+    def to_info(self) -> DownloadJobInfo:
+        return DownloadJobInfo(
+            jobId=self.jobId,
+            songMid=self.songMid,
+            status=self.status,
+            filePath=self.filePath,
+            totalBytes=self.totalBytes,
+            downloadedBytes=sum(segment.written for segment in self.segments),
+            segments=len(self.segments),
+            errorCode=self.errorCode,
+            error=self.error,
+            bundle=self.bundle,
+            createdAt=self.createdAt,
+            updatedAt=self.updatedAt,
+        )
+
+
+class DownloadManager:
+    """任务按创建顺序排队，由 APP_DOWNLOAD_MAX_JOBS 个 worker 执行；进度变化通过事件通知订阅者"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._jobs: dict[str, _Job] = {}
+        self._queue: asyncio.Queue[str] = asyncio.Queue()
+        self._running: dict[str, asyncio.Task] = {}
+        self._changed = asyncio.Event()
+        self._dirty = False
+
+    async def run(self) -> None:
+        """加载历史任务（下载中的任务重新排队续传）并启动 worker，定期把任务状态写盘；取消时最后写盘一次"""
+        for job in await asyncio.to_thread(self._read_jobs):
+            self._jobs[job.jobId] = job
+            if job.status in _ACTIVE_STATUSES:
+                job.status = "queued"
+                self._queue.put_nowait(job.jobId)
+        workers = [asyncio.create_task(self._worker()) for _ in range(settings.download_max_jobs)]
+        try:
+            while True:
+                await asyncio.sleep(SAVE_INTERVAL_SECONDS)
+                if self._dirty:
+                    await self._save()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            for worker in workers:
+                with suppress(asyncio.CancelledError):
+                    await worker
+            try:
+                self._write_jobs(self._snapshot())
+            except OSError:
+                logger.warning("下载任务写盘失败", exc_info=True)
+
+    def submit(self, items) -> DownloadJobListResponse:
+        """校验并创建下载任务，加入队列"""
+        for item in items:
+            if not os.path.isabs(item.targetDir):
+                raise ServiceException(ErrorCode.PARAM_ERROR, "保存目录必须为绝对路径")
+            if item.fileName and (_UNSAFE_FILENAME_CHARS.search(item.fileName) or ".." in item.fileName):
+                raise ServiceException(ErrorCode.PARAM_ERROR, "文件名不合法")
+
+        now = int(time.time())
+        jobs = []
+        for item in items:
+            job = _Job(
+                jobId=uuid.uuid4().hex,
+                songMid=item.songMid,
+                targetDir=item.targetDir,
+                fileName=item.fileName.strip(),
+                createdAt=now,
+                updatedAt=now,
+            )
+            self._jobs[job.jobId] = job
+            self._queue.put_nowait(job.jobId)
+            jobs.append(job)
+        self._touch(*jobs)
+        logger.info(f"新建下载任务: count={len(jobs)}")
+        return DownloadJobListResponse(jobs=[job.to_info() for job in jobs])
+
+    def list_jobs(self) -> DownloadJobListResponse:
+        return DownloadJobListResponse(jobs=[job.to_info() for job in self._jobs.values()])
+
+    def cancel(self, job_id: str) -> DownloadJobInfo:
+        """取消排队或下载中的任务，已下载分段保留，重试时续传"""
+        job = self._get(job_id)
+        if job.status in _ACTIVE_STATUSES:
+            job.status = "cancelled"
+            task = self._running.get(job_id)
+            if task is not None:
+                task.cancel()
+            self._touch(job)
+        return job.to_info()
+
+    def retry(self, job_id: str) -> DownloadJobInfo:
+        """失败或已取消的任务重新排队（从已提交的分段进度继续）"""
+        job = self._get(job_id)
+        if job.status in ("failed", "cancelled"):
+            job.status = "queued"
+            job.errorCode = 0
+            job.error = ""
+            self._queue.put_nowait(job_id)
+            self._touch(job)
+        return job.to_info()
+
+    async def remove(self, job_id: str) -> None:
+        """删除任务记录；未完成的任务同时停止下载并删除临时文件"""
+        job = self._get(job_id)
+        task = self._running.get(job_id)
+        if task is not None:
+            job.status = "cancelled"
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                # 只吞掉被删除任务自身的取消；调用方被取消（如客户端断开）时继续抛出
+                if not task.cancelled() or asyncio.current_task().cancelling():
+                    raise
+        del self._jobs[job_id]
+        if job.status != "completed" and job.filePath:
+            with suppress(OSError):
+                await asyncio.to_thread(os.remove, _part_path(job))
+        self._touch()
+
+    async def iter_events(self):
+        """先推送全部任务，之后只推送有变化的任务（最多每 PROGRESS_INTERVAL_SECONDS 一次）与被删除的任务"""
+        sent: dict[str, int] = {}
+        while True:
+            changed = self._changed
+            for job in list(self._jobs.values()):
+                if sent.get(job.jobId) != job.revision:
+                    sent[job.jobId] = job.revision
+                    yield {"event": "job", "job": job.to_info().model_dump()}
+            for job_id in [job_id for job_id in sent if job_id not in self._jobs]:
+                del sent[job_id]
+                yield {"event": "removed", "jobId": job_id}
+            await changed.wait()
+            await asyncio.sleep(PROGRESS_INTERVAL_SECONDS)
+
+    def _get(self, job_id: str) -> _Job:
+        job = self._jobs.get(job_id)
+        if job is None:
+            raise ServiceException(ErrorCode.DATA_NOT_FOUND, "下载任务不存在")
+        return job
+
+    def _touch(self, *jobs: _Job) -> None:
+        """记录变更并唤醒进度订阅者"""
+        now = int(time.time())
+        for job in jobs:
+            job.revision += 1
+            job.updatedAt = now
+        self._dirty = True
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            job = self._jobs.get(job_id)
+            if job is None or job.status != "queued" or job_id in self._running:
+                continue
+            task = asyncio.create_task(self._run_job(job))
+            self._running[job_id] = task
+            try:
+                await task
+            except asyncio.CancelledError:
+                # 任务被用户取消时 worker 继续处理下一个；worker 自身被取消（应用关闭）时退出
+                if not task.cancelled() or asyncio.current_task().cancelling():
+                    raise
+            except Exception:
+                # _run_job 已兜底记录失败，这里只防止意外异常终止 worker
+                logger.exception(f"下载 worker 异常: job_id={job_id}")
+                if job.status == "downloading":
+                    self._fail(job, ErrorCode.AI_SERVICE_ERROR, "下载失败，请稍后重试")
+                    self._touch(job)
+            finally:
+                self._running.pop(job_id, None)
+                # 取消后立即重试时，队列中的条目可能因旧任务仍在收尾被跳过，这里补回队列
+                if job.status == "queued":
+                    self._queue.put_nowait(job_id)
+
+    async def _run_job(self, job: _Job) -> None:
+        job.status = "downloading"
+        self._touch(job)
+        try:
+            await self._download(job)
+        except ServiceException as exc:
+            self._fail(job, exc.code, exc.message)
+        except (httpx.HTTPError, _SegmentError, OSError) as exc:
+            logger.warning(f"下载失败: song_mid={job.songMid} error={exc!r}")
+            self._fail(job, ErrorCode.AI_SERVICE_ERROR, "下载失败，请稍后重试")
+        except Exception:
+            logger.exception(f"下载任务异常: song_mid={job.songMid}")
+            self._fail(job, ErrorCode.AI_SERVICE_ERROR, "下载失败，请稍后重试")
+        else:
+            job.status = "completed"
+            logger.info(f"下载完成: song_mid={job.songMid} path={job.filePath}")
+        self._touch(job)
+
+    def _fail(self, job: _Job, code: int, message: str) -> None:
+        job.status = "failed"
+        job.errorCode = code
+        job.error = message
+
+    async def _download(self, job: _Job) -> None:
+        """每次执行都重新解析链接（vkey 会过期）；文件总长与分段计划未变时从已提交进度续传"""
+        await services_auth.ensure_credential_fresh()
+        bundle = await get_song_download_bundle(job.songMid)
+        url = bundle.songUrl.url
+        if not url:
+            raise ServiceException(ErrorCode.DATA_NOT_FOUND, "歌曲暂无可下载链接")
+        job.bundle = bundle.model_dump()
+        if not job.filePath:
+            base_name = job.fileName or f"{bundle.singer} - {bundle.songName}"
+            job.filePath = await asyncio.to_thread(_reserve_path, job.targetDir, base_name, bundle.songUrl.urlType)
+
+        part_path = _part_path(job)
+        url, total, range_supported = await _probe(url)
+        part_size = await asyncio.to_thread(_file_size, part_path)
+        resumable = range_supported and job.rangeSupported and job.segments and total == job.totalBytes
+        if not (resumable and part_size == total):
+            job.totalBytes = total
+            job.rangeSupported = range_supported
+            job.segments = _plan_segments(total, range_supported)
+            await asyncio.to_thread(_preallocate, part_path, total if range_supported else 0)
+        for segment in job.segments:
+            segment.written = segment.committed
+        self._touch(job)
+
+        try:
+            async with asyncio.TaskGroup() as group:
+                for segment in job.segments:
+                    if not segment.done:
+                        group.create_task(self._download_segment(job, url, part_path, segment))
+        except ExceptionGroup as exc:
+            raise exc.exceptions[0] from exc
+
+        if not job.totalBytes:
+            job.totalBytes = sum(segment.written for segment in job.segments)
+        await asyncio.to_thread(os.replace, part_path, job.filePath)
+
+    async def _download_segment(self, job: _Job, url: str, part_path: Path, segment: _Segment) -> None:
+        """失败时降低当前 CDN 节点优先级，重试轮换到其他节点（vkey 与节点无关）"""
+        candidates = cdn_selector.candidate_urls(url)
+        for attempt in range(SEGMENT_MAX_RETRIES + 1):
+            candidate = candidates[attempt % len(candidates)]
+            try:
+                await self._fetch_segment(job, candidate, part_path, segment)
+                return
+            except (httpx.HTTPError, _SegmentError) as exc:
+                cdn_selector.report_failure(candidate)
+                if attempt == SEGMENT_MAX_RETRIES:
+                    raise
+                logger.warning(f"分段下载失败，重试: song_mid={job.songMid} start={segment.start} error={exc!r}")
+                await asyncio.sleep(2**attempt)
+
+    async def _fetch_segment(self, job: _Job, url: str, part_path: Path, segment: _Segment) -> None:
+        """从分段已提交位置继续写入；不支持 Range 时只能整文件从头下载"""
+        if not job.rangeSupported:
+            segment.committed = 0
+        segment.written = segment.committed
+        offset = segment.start + segment.committed
+        headers = {"Range": f"bytes={offset}-{segment.end}"} if job.rangeSupported else {}
+        remaining = segment.end - offset + 1 if segment.end >= 0 else None
+
+        async with get_media_client().stream("GET", url, headers=headers, timeout=_TIMEOUT) as response:
+            if response.status_code != (206 if job.rangeSupported else 200):
+                raise _SegmentError(f"响应状态异常: {response.status_code}")
+            with open(part_path, "r+b") as file:
+                file.seek(offset)
+                try:
+                    await self._write_stream(job, response, file, segment, remaining)
+                    if not job.rangeSupported:
+                        file.truncate()
+                finally:
+                    # 中断（含取消、应用关闭）时也把已写入的字节落盘并提交，续传不必重下
+                    _sync(file)
+                    segment.committed = segment.written
+                    self._touch(job)
+
+        if segment.end >= 0 and not segment.done:
+            raise _SegmentError("分段长度不足")
+
+    async def _write_stream(self, job: _Job, response, file, segment: _Segment, remaining: int | None) -> None:
+        """缓冲写入响应体，每 CHECKPOINT_BYTES 落盘提交一次；remaining 为本段剩余字节数，多余数据丢弃"""
+        buffer = bytearray()
+        received = 0
+        async for data in response.aiter_bytes():
+            if remaining is not None:
+                data = data[: remaining - received]
+            received += len(data)
+            buffer += data
+            if len(buffer) >= WRITE_BUFFER_BYTES:
+                await asyncio.to_thread(file.write, bytes(buffer))
+                segment.written += len(buffer)
+                buffer.clear()
+                if segment.written - segment.committed >= CHECKPOINT_BYTES:
+                    await asyncio.to_thread(_sync, file)
+                    segment.committed = segment.written
+                self._touch(job)
+        if buffer:
+            await asyncio.to_thread(file.write, bytes(buffer))
+            segment.written += len(buffer)
+
+    def _snapshot(self) -> list[dict]:
+        """写盘用的任务快照；下载中的任务记为排队，重启后续传"""
+        snapshot = []
+        for job in self._jobs.values():
+            data = asdict(job)
+            if data["status"] == "downloading":
+                data["status"] = "queued"
+            snapshot.append(data)
+        return snapshot
+
+    async def _save(self) -> None:
+        self._dirty = False
+        try:
+            await asyncio.to_thread(self._write_jobs, self._snapshot())
+        except OSError:
+            self._dirty = True
+            logger.warning("下载任务写盘失败", exc_info=True)
+
+    def _write_jobs(self, jobs: list[dict]) -> None:
+        os.makedirs(self.path.parent, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump({"version": JOBS_FILE_VERSION, "jobs": jobs}, file, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def _read_jobs(self) -> list[_Job]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            return []
+        except (OSError, ValueError):
+            logger.warning("下载任务文件损坏，已忽略", exc_info=True)
+            return []
+        if not isinstance(data, dict) or data.get("version") != JOBS_FILE_VERSION:
+            return []
+        jobs = []
+        for item in data.get("jobs", []):
+            try:
+                segments = [_Segment(**segment) for segment in item.pop("segments", [])]
+                for segment in segments:
+                    segment.written = segment.committed
+                jobs.append(_Job(**item, segments=segments))
+            except TypeError:
+                logger.warning("忽略无法解析的下载任务记录")
+        return jobs
+
+
+download_manager = DownloadManager(DOWNLOAD_JOBS_PATH)
+
+
+async def stream_job_events(stream_format="ndjson"):
+    """下载进度事件流（NDJSON 或 SSE），客户端断开前持续推送"""
+    return encode_stream_events(download_manager.iter_events(), stream_format)
+
+
+"""辅助函数"""
+
+
+async def _probe(url):
+    """请求首字节探测文件总长与是否支持 Range，返回 (可用链接, 总长, 是否支持 Range)；总长未知为 0
+
+    连接失败或节点 5xx 时按得分切换到其他 CDN 节点
+    """
+    status_code = None
+    for candidate in cdn_selector.candidate_urls(url):
+        try:
+            async with get_media_client().stream(
+                "GET", candidate, headers={"Range": "bytes=0-0"}, timeout=_TIMEOUT
+            ) as response:
+                status_code = response.status_code
+                if status_code == 206:
+                    match = CONTENT_RANGE_PATTERN.match(response.headers.get("content-range", ""))
+                    if match is not None:
+                        return candidate, int(match.group(3)), True
+                    # Content-Length 只是探测的首字节长度，总长未知时整文件下载
+                    logger.warning(f"下载源 Content-Range 无法解析: {response.headers.get('content-range')!r}")
+                    return candidate, 0, False
+                if status_code == 200:
+                    return candidate, int(response.headers.get("content-length") or 0), False
+        except httpx.HTTPError as exc:
+            logger.warning(f"下载源探测失败: error={exc!r}")
+            cdn_selector.report_failure(candidate)
+            continue
+        if status_code < 500:
+            break
+        cdn_selector.report_failure(candidate)
+    logger.error(f"下载源状态异常: status={status_code}")
+    raise ServiceException(ErrorCode.AI_SERVICE_ERROR, "下载失败，请稍后重试")
+
+
+def _plan_segments(total, range_supported) -> list[_Segment]:
+    """按 APP_DOWNLOAD_SEGMENTS 均分文件，每段不小于 MIN_SEGMENT_BYTES；不支持 Range 时整文件一段"""
+    if not range_supported or not total:
+        return [_Segment(start=0, end=total - 1 if total else -1)]
+    count = max(min(settings.download_segments, total // MIN_SEGMENT_BYTES), 1)
+    size = math.ceil(total / count)
+    return [_Segment(start=start, end=min(start + size, total) - 1) for start in range(0, total, size)]
+
+
+def _part_path(job) -> Path:
+    return Path(f"{job.filePath}.part")
+
+
+def _reserve_path(target_dir, base_name, url_type) -> str:
+    """确定保存路径，重名时追加 (1)(2) 序号；创建空的 .part 文件占位，避免并发任务选中同一路径"""
+    base_name = _UNSAFE_FILENAME_CHARS.sub("_", base_name).strip(" .") or "untitled"
+    extension = f".{url_type}" if url_type else ""
+    os.makedirs(target_dir, exist_ok=True)
+    counter = 0
+    while True:
+        name = f"{base_name}({counter}){extension}" if counter else f"{base_name}{extension}"
+        path = os.path.join(target_dir, name)
+        if not os.path.exists(path):
+            try:
+                with open(f"{path}.part", "xb"):
+                    return path
+            except FileExistsError:
+                pass
+        counter += 1
+
+
+def _file_size(path) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return -1
+
+
+def _preallocate(path, size) -> None:
+    with open(path, "wb") as file:
+        file.truncate(size)
+
+
+def _sync(file) -> None:
+    file.flush()
+    os.fsync(file.fileno())
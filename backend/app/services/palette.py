@@ -0,0 +1,192 @@
+"""专辑配色：由封面缩略图降采样后整批量化像素，挑出主色/鲜艳色/柔和色，结果按专辑落盘缓存"""
+import asyncio
+import io
+import json
+import os
+import threading
+
+import numpy as np
+from PIL import Image, UnidentifiedImageError
+
+from app.core.config import settings
+from app.core.paths import PALETTE_CACHE_DIR
+from app.qqmusic.ids import MID_PATTERN
+from app.schemas.common import ErrorCode
+from app.schemas.cover import AlbumPaletteBatchResponse, AlbumPaletteResponse, PaletteSwatch
+from app.services.cover import collect_album_mids, get_cover
+from app.utils.exception import ServiceException
+from app.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# 算法或参数变化时递增，旧缓存自动重算
+PALETTE_VERSION = 1
+SAMPLE_SIZE = 64
+# 每通道保留的高位数，4 位即 16^3 个颜色桶
+QUANT_BITS = 4
+SWATCH_COUNT = 6
+# 鲜艳色/柔和色候选的最小像素占比，过滤零星噪点
+MIN_SWATCH_POPULATION = 0.005
+# 目标饱和度与允许范围 (目标, 最小, 最大)；亮度统一以 0.5 为目标、0.3～0.7 为范围
+VIBRANT_SATURATION = (1.0, 0.35, 1.0)
+MUTED_SATURATION = (0.3, 0.0, 0.4)
+TARGET_LIGHTNESS = (0.5, 0.3, 0.7)
+# 饱和度/亮度/占比在候选打分中的权重
+SCORE_WEIGHTS = (0.24, 0.52, 0.24)
+
+
+async def get_album_palette(album_mid):
+    """获取专辑配色：磁盘缓存优先，未缓存时取 thumb 封面计算并写入缓存"""
+    if not MID_PATTERN.match(album_mid or ""):
+        raise ServiceException(ErrorCode.PARAM_ERROR, "专辑 MID 无效")
+    palette = await asyncio.to_thread(_read_palette, album_mid)
+    if palette is None:
+        palette = await _compute_album_palette(album_mid)
+    return palette
+
+
+async def get_album_palettes(album_mid_list, playlist_id=0, request_id=""):
+    """批量获取专辑配色（指定专辑与/或歌单全部歌曲的专辑），未缓存的限流并发计算；封面获取失败的单独列出"""
+    mids = await collect_album_mids(album_mid_list, playlist_id, request_id)
+    cached = await asyncio.to_thread(lambda: {mid: _read_palette(mid) for mid in mids})
+    semaphore = asyncio.Semaphore(settings.cover_prefetch_concurrency)
+
+    async def compute_one(album_mid):
+        async with semaphore:
+            try:
+                return await _compute_album_palette(album_mid)
+            except Exception:
+                logger.warning(f"计算专辑配色失败: album_mid={album_mid}")
+                return None
+
+    pending = [mid for mid in mids if cached[mid] is None]
+    computed = dict(zip(pending, await asyncio.gather(*(compute_one(mid) for mid in pending))))
+    palettes = {**cached, **computed}
+
+    logger.info(f"批量专辑配色: total={len(mids)} cached={len(mids) - len(pending)} computed={len(pending)}")
+    return AlbumPaletteBatchResponse(
+        requestId=request_id,
+        result=[palettes[mid] for mid in mids if palettes[mid] is not None],
+        failed=[mid for mid in mids if palettes[mid] is None],
+    )
+
+
+def compute_palette(image_bytes):
+    """从图片计算 (主色, 鲜艳色, 柔和色, 色板)：降采样到 SAMPLE_SIZE 后按 QUANT_BITS 量化分桶，桶内取平均色
+
+    鲜艳色/柔和色按饱和度、亮度接近目标值及像素占比打分选出，无合适候选时退回主色
+    """
+    image = Image.open(io.BytesIO(image_bytes))
+    image.draft("RGB", (SAMPLE_SIZE, SAMPLE_SIZE))
+    image = image.convert("RGB")
+    image.thumbnail((SAMPLE_SIZE, SAMPLE_SIZE))
+    pixels = np.asarray(image, dtype=np.uint8).reshape(-1, 3)
+
+    quantized = (pixels >> (8 - QUANT_BITS)).astype(np.intp)
+    keys = (quantized[:, 0] << (2 * QUANT_BITS)) | (quantized[:, 1] << QUANT_BITS) | quantized[:, 2]
+    bucket_count = 1 << (3 * QUANT_BITS)
+    counts = np.bincount(keys, minlength=bucket_count)
+    occupied = np.flatnonzero(counts)
+    sums = np.stack(
+        [np.bincount(keys, weights=pixels[:, channel], minlength=bucket_count) for channel in range(3)], axis=1
+    )
+    colors = sums[occupied] / counts[occupied, None]
+    population = counts[occupied] / len(pixels)
+    saturation, lightness = _saturation_lightness(colors / 255)
+
+    dominant = int(np.argmax(population))
+    vibrant = _pick_swatch(saturation, lightness, population, VIBRANT_SATURATION)
+    muted = _pick_swatch(saturation, lightness, population, MUTED_SATURATION)
+    top = np.argsort(population)[::-1][:SWATCH_COUNT]
+    return (
+        _hex(colors[dominant]),
+        _hex(colors[dominant if vibrant is None else vibrant]),
+        _hex(colors[dominant if muted is None else muted]),
+        [(_hex(colors[index]), round(float(population[index]), 4)) for index in top],
+    )
+
+
+"""辅助函数"""
+
+
+async def _compute_album_palette(album_mid):
+    cover = await get_cover(album_mid, "thumb")
+    try:
+        dominant, vibrant, muted, swatches = await asyncio.to_thread(compute_palette, cover.data)
+    except (UnidentifiedImageError, OSError) as exc:
+        logger.warning(f"封面图片无法解码: album_mid={album_mid}")
+        raise ServiceException(ErrorCode.AI_SERVICE_ERROR, "封面图片无法解析") from exc
+    palette = AlbumPaletteResponse(
+        albumMid=album_mid,
+        dominant=dominant,
+        vibrant=vibrant,
+        muted=muted,
+        swatches=[PaletteSwatch(color=color, population=share) for color, share in swatches],
+    )
+    await asyncio.to_thread(_write_palette, palette)
+    return palette
+
+
+def _saturation_lightness(rgb):
+    """逐行 RGB（0～1）转 HSL 的饱和度与亮度"""
+    high = rgb.max(axis=1)
+    low = rgb.min(axis=1)
+    lightness = (high + low) / 2
+    denominator = 1 - np.abs(2 * lightness - 1)
+    saturation = np.divide(high - low, denominator, out=np.zeros_like(lightness), where=denominator > 1e-6)
+    return saturation, lightness
+
+
+def _pick_swatch(saturation, lightness, population, saturation_range):
+    """在饱和度、亮度范围内且占比足够的桶中取得分最高者，无候选返回 None"""
+    target_saturation, min_saturation, max_saturation = saturation_range
+    target_lightness, min_lightness, max_lightness = TARGET_LIGHTNESS
+    mask = (
+        (saturation >= min_saturation)
+        & (saturation <= max_saturation)
+        & (lightness >= min_lightness)
+        & (lightness <= max_lightness)
+        & (population >= MIN_SWATCH_POPULATION)
+    )
+    if not mask.any():
+        return None
+    saturation_weight, lightness_weight, population_weight = SCORE_WEIGHTS
+    score = (
+        saturation_weight * (1 - np.abs(saturation - target_saturation))
+        + lightness_weight * (1 - np.abs(lightness - target_lightness))
+        + population_weight * population / population[mask].max()
+    )
+    return int(np.argmax(np.where(mask, score, -np.inf)))
+
+
+def _hex(color):
+    red, green, blue = (int(round(value)) for value in color)
+    return f"#{red:02x}{green:02x}{blue:02x}"
+
+
+def _palette_path(album_mid):
+    return PALETTE_CACHE_DIR / album_mid[:2] / f"{album_mid}.json"
+
+
+def _read_palette(album_mid):
+    """读取缓存配色；未缓存、版本过旧或文件损坏时返回 None"""
+    try:
+        with open(_palette_path(album_mid), "r", encoding="utf-8") as file:
+            data = json.load(file)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError):
+        logger.warning(f"专辑配色缓存损坏，已忽略: album_mid={album_mid}")
+        return None
+    if not isinstance(data, dict) or data.get("version") != PALETTE_VERSION:
+        return None
+    return AlbumPaletteResponse.model_validate(data.get("palette") or {})
+
+
+def _write_palette(palette):
+    path = _palette_path(palette.albumMid)
+    os.makedirs(path.parent, exist_ok=True)
+    tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump({"version": PALETTE_VERSION, "palette": palette.model_dump()}, file)
+    os.replace(tmp_path, path)
@@ -0,0 +1,167 @@
+"""歌单增量同步：按歌单持久化有序 MID 快照（内容哈希作版本号），按客户端版本返回插入/删除/移动差异
+
+客户端应用差异：新列表长度为 total，先把 inserted 与 moved 放到各自的新位置，
+再用旧列表中既未删除也未移动的歌曲按原有顺序依次填满剩余位置。
+"""
+import asyncio
+import bisect
+import hashlib
+import json
+import os
+import time
+
+from app.core.paths import PLAYLIST_SNAPSHOT_DIR
+from app.schemas.common import ErrorCode
+from app.schemas.qqmusic import (
+    PlaylistInsertedEntry,
+    PlaylistMovedEntry,
+    PlaylistRemovedEntry,
+    PlaylistSyncResponse,
+)
+from app.services.qqmusic import get_songlist_detail_all
+from app.utils.exception import ServiceException
+from app.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# 每个歌单保留的历史版本数；客户端版本不在其中时退化为全量
+SNAPSHOT_HISTORY_SIZE = 5
+
+_lock = asyncio.Lock()
+
+
+async def sync_playlist(playlist_id, since_version="", request_id=""):
+    """拉取歌单最新内容并与客户端版本的快照比较，返回差异；记录新版本快照"""
+    detail = await get_songlist_detail_all(playlist_id, request_id=request_id, with_urls=False)
+    if detail.failedPages:
+        # 缺页会被误判为删除，不能据此生成差异或记录快照
+        raise ServiceException(ErrorCode.AI_SERVICE_ERROR, "歌单获取不完整，请稍后重试")
+
+    songs = detail.result
+    keys = [_song_key(song) for song in songs]
+    version = _snapshot_version(keys)
+
+    async with _lock:
+        snapshots = await asyncio.to_thread(_read_snapshots, playlist_id)
+        base = next((snapshot for snapshot in snapshots if snapshot["version"] == since_version), None)
+        if not snapshots or snapshots[0]["version"] != version:
+            latest = {"version": version, "keys": keys, "createdAt": int(time.time())}
+            snapshots = [latest] + [snapshot for snapshot in snapshots if snapshot["version"] != version]
+            await asyncio.to_thread(_write_snapshots, playlist_id, snapshots[:SNAPSHOT_HISTORY_SIZE])
+
+    response = PlaylistSyncResponse(requestId=request_id, version=version, total=len(songs))
+    if not since_version or base is None:
+        response.full = True
+        response.result = songs
+        return response
+
+    response.baseVersion = since_version
+    if since_version == version:
+        return response
+
+    inserted, removed, moved = _diff_keys(base["keys"], keys)
+    response.inserted = [PlaylistInsertedEntry(index=index, song=songs[index]) for index in inserted]
+    response.removed = [PlaylistRemovedEntry(index=index, songMid=_key_mid(base["keys"][index])) for index in removed]
+    response.moved = [
+        PlaylistMovedEntry(fromIndex=old_index, toIndex=new_index, songMid=songs[new_index].songMid)
+        for old_index, new_index in moved
+    ]
+    logger.info(
+        f"歌单增量同步: playlist_id={playlist_id} inserted={len(inserted)} removed={len(removed)} moved={len(moved)}"
+    )
+    return response
+
+
+"""辅助函数"""
+
+
+def _song_key(song):
+    """歌曲在快照中的标识：优先 MID，无 MID 时退回歌曲 ID"""
+    return song.songMid or f"id:{song.songId}"
+
+
+def _key_mid(key):
+    return "" if key.startswith("id:") else key
+
+
+def _snapshot_version(keys):
+    return hashlib.sha1("\n".join(keys).encode("utf-8")).hexdigest()[:16]
+
+
+def _snapshot_path(playlist_id):
+    return PLAYLIST_SNAPSHOT_DIR / f"{playlist_id}.json"
+
+
+def _read_snapshots(playlist_id) -> list[dict]:
+    """同步读取歌单快照历史（新版本在前）；不存在或损坏时返回空列表"""
+    try:
+        with open(_snapshot_path(playlist_id), "r", encoding="utf-8") as file:
+            snapshots = json.load(file).get("snapshots", [])
+    except (OSError, ValueError, AttributeError):
+        return []
+    return [snapshot for snapshot in snapshots if isinstance(snapshot, dict) and "version" in snapshot]
+
+
+def _write_snapshots(playlist_id, snapshots: list[dict]) -> None:
+    """同步写入歌单快照历史，临时文件原子替换"""
+    os.makedirs(PLAYLIST_SNAPSHOT_DIR, exist_ok=True)
+    path = _snapshot_path(playlist_id)
+    tmp_path = path.with_suffix(".json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump({"snapshots": snapshots}, file, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def _tag_occurrences(keys):
+    """同一首歌在歌单中重复出现时按出现次序区分"""
+    seen = {}
+    tagged = []
+    for key in keys:
+        seen[key] = seen.get(key, 0) + 1
+        tagged.append((key, seen[key]))
+    return tagged
+
+
+def _diff_keys(old_keys, new_keys):
+    """返回 (新增的新下标, 删除的旧下标, 移动的 (旧下标, 新下标))
+
+    两边都存在的歌曲中，旧下标构成最长递增子序列的部分视为未移动，其余视为移动，使移动条目最少。
+    """
+    old_positions = {tagged: index for index, tagged in enumerate(_tag_occurrences(old_keys))}
+    inserted = []
+    kept = []
+    for new_index, tagged in enumerate(_tag_occurrences(new_keys)):
+        old_index = old_positions.pop(tagged, None)
+        if old_index is None:
+            inserted.append(new_index)
+        else:
+            kept.append((old_index, new_index))
+    removed = sorted(old_positions.values())
+
+    stable = _longest_increasing_subsequence([old_index for old_index, _ in kept])
+    moved = [pair for position, pair in enumerate(kept) if position not in stable]
+    return inserted, removed, moved
+
+
+def _longest_increasing_subsequence(values):
+    """返回最长严格递增子序列在 values 中的下标集合（O(n log n)）"""
+    tail_values = []
+    tail_positions = []
+    previous = [-1] * len(values)
+    for position, value in enumerate(values):
+        slot = bisect.bisect_left(tail_values, value)
+        if slot > 0:
+            previous[position] = tail_positions[slot - 1]
+        if slot == len(tail_values):
+            tail_values.append(value)
+            tail_positions.append(position)
+        else:
+            tail_values[slot] = value
+            tail_positions[slot] = position
+
+    result = set()
+    position = tail_positions[-1] if tail_positions else -1
+    while position != -1:
+        result.add(position)
+        position = previous[position]
+    return result
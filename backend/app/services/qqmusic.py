@@ -1,49 +1,114 @@
 """QQ音乐业务服务——歌曲搜索、用户歌单、歌曲链接"""
 import asyncio
+import math
+import time
+import unicodedata
+from contextlib import suppress
+from dataclasses import dataclass
 from urllib.parse import parse_qs, urlparse
 
-import httpx
 from qqmusic_api.core.exceptions import LoginExpiredError, NotLoginError, RatelimitedError
 from qqmusic_api.modules.song import SongFileInfo, SongFileType
 from qqmusic_api.modules.search import SearchType
 
+from app.core.config import settings
 from app.credential.get_credential import get_credential
-from app.qqmusic.client import get_client
+from app.qqmusic.cache import (
+    liked_songs_cache,
+    search_cache,
+    song_url_cache,
+    song_url_unavailable_cache,
+    structured_lyrics_cache,
+    suggest_cache,
+)
+from app.qqmusic.cdn import cdn_selector
+from app.qqmusic.client import get_client, get_coalesce_stats
+from app.qqmusic.http_client import get_http_client
+from app.qqmusic.ids import MID_PATTERN
+from app.qqmusic.lyrics_parser import build_lyric_lines
+from app.qqmusic.lyrics_store import LyricsEntry, lyrics_store
+from app.qqmusic.metadata_store import SongRecord, song_metadata_store
+from app.qqmusic.search_index import local_song_index
+from app.qqmusic.share_link_store import share_link_store
 from app.schemas.common import ErrorCode
 from app.schemas.qqmusic import (
     AlbumImgResponse,
     AlbumInfo,
+    BackendStatsResponse,
+    CacheStats,
+    CdnHostStats,
+    CoalesceStats,
     LikedSongsResponse,
+    LyricsPrefetchResponse,
+    LyricsResponse,
     PlaylistSongsResponse,
     QMPlaylistItem,
     SearchResponse,
+    SongDownloadBundleBatchItem,
+    SongDownloadBundleBatchResponse,
     SongDownloadBundleResponse,
     SongItem,
     SongUrlInfo,
     SongUrlItem,
     SongUrlResponse,
+    StructuredLyricsResponse,
+    SuggestResponse,
     UserPlaylistsResponse,
 )
 from app.utils import ensure_https
 from app.utils.exception import ServiceException
 from app.utils.logger import setup_logger
+from app.utils.stream import encode_stream_events
 
 logger = setup_logger(__name__)
 
 ALBUM_COVER_TEMPLATE = "https://y.gtimg.cn/music/photo_new/T002R300x300M000{mid}.jpg"
-CDN_DOMAIN = "https://isure.stream.qqmusic.qq.com/"
 RESOLVE_URL_TIMEOUT_SECONDS = 10
 SONGLIST_MAX_PAGES = 50
+SONGLIST_PAGE_SIZE = 100
+SONG_URL_REFRESH_AHEAD_SECONDS = 300
+SUGGEST_MAX_ITEMS = 10
+BATCH_SEARCH_MAX_RETRIES = 4
+BATCH_SEARCH_BACKOFF_BASE_SECONDS = 1
+BATCH_SEARCH_BACKOFF_MAX_SECONDS = 30
+
+_search_prefetching: set[tuple] = set()
+_suggest_tasks: dict[str, asyncio.Task] = {}
+_lyrics_prefetching: set[str] = set()
+_background_tasks: set[asyncio.Task] = set()
+
+
+@dataclass(frozen=True)
+class _QualityTier:
+    file_type: SongFileType
+    quality: str
+    bitrate: int
+
+
+# 音质阶梯：由高到低逐级降级，bitrate 为标称码率（kbps）
+SONG_QUALITY_LADDER = (
+    _QualityTier(SongFileType.FLAC, "flac", 1411),
+    _QualityTier(SongFileType.OGG_320, "ogg_320", 320),
+    _QualityTier(SongFileType.MP3_320, "mp3_320", 320),
+    _QualityTier(SongFileType.MP3_128, "mp3_128", 128),
+    _QualityTier(SongFileType.ACC_96, "acc_96", 96),
+)
 
 
 # ========== 公共入口函数 ==========
 
 
 async def resolve_search_url(url_type, search_url):
-    """解析 QQ 音乐分享链接重定向，返回歌曲/歌单 ID"""
+    """解析 QQ 音乐分享链接重定向，返回歌曲/歌单 ID；解析过的链接直接读本地缓存"""
+    search_url = search_url.strip()
+    cached = await asyncio.to_thread(share_link_store.get, search_url)
+    if cached is not None and cached[0] == url_type:
+        return cached[1]
+
     try:
-        async with httpx.AsyncClient(timeout=RESOLVE_URL_TIMEOUT_SECONDS) as http_client:
-            response = await http_client.get(search_url, follow_redirects=False)
+        response = await get_http_client().get(
+            search_url, follow_redirects=False, timeout=RESOLVE_URL_TIMEOUT_SECONDS
+        )
     except Exception as exc:
         logger.error(f"分享链接请求失败: url={search_url} error={exc}", exc_info=True)
         raise ServiceException(ErrorCode.AI_SERVICE_ERROR, "链接请求失败") from exc
@@ -63,13 +128,29 @@ async def resolve_search_url(url_type, search_url):
         raise ServiceException(ErrorCode.PARAM_ERROR, "未找到歌曲ID" if url_type == "song" else "未找到歌单ID")
 
     try:
-        return int(params[param_key][0])
+        resource_id = int(params[param_key][0])
     except (ValueError, TypeError) as exc:
         raise ServiceException(ErrorCode.PARAM_ERROR, "链接参数无效") from exc
 
+    try:
+        await asyncio.to_thread(share_link_store.put, search_url, url_type, resource_id)
+    except OSError:
+        logger.warning(f"写入分享链接缓存失败: url={search_url}")
+    return resource_id
+
 
 async def get_song_detail(song_id, request_id=""):
-    """获取单曲详情"""
+    """获取单曲详情（本地元数据库中详情未过期时直接返回）"""
+    try:
+        cached = await asyncio.to_thread(
+            song_metadata_store.get_detail_by_id, song_id, settings.song_metadata_ttl_hours * 3600
+        )
+    except Exception:
+        logger.warning(f"读取本地歌曲元数据失败: song_id={song_id}", exc_info=True)
+        cached = None
+    if cached is not None:
+        return SearchResponse(result=[cached], total=1, requestId=request_id)
+
     client = await get_client()
 
     try:
@@ -83,6 +164,7 @@ async def get_song_detail(song_id, request_id=""):
         raise ServiceException(ErrorCode.AI_SERVICE_ERROR, "服务调用失败，请稍后重试")
 
     item = _build_single_song_item(song_id, detail)
+    await _remember_songs([_song_record(item, detail.track)], with_detail=True)
     return SearchResponse(result=[item], total=1, requestId=request_id)
 
 
@@ -102,33 +184,29 @@ async def get_songlist_detail(songlist_id, page, page_size, request_id=""):
         logger.error(f"获取歌单详情失败: songlist_id={songlist_id}", exc_info=True)
         raise ServiceException(ErrorCode.AI_SERVICE_ERROR, "服务调用失败，请稍后重试")
 
-    items = [_build_songlist_item(song) for song in result.songs]
+    records = [_song_record(_build_songlist_item(song), song) for song in result.songs]
+    await _remember_songs(records)
+    items = [record.item for record in records]
     return PlaylistSongsResponse(result=items, total=result.total, requestId=request_id)
 
 
-async def get_songlist_detail_all(songlist_id, request_id=""):
-    """获取歌单全部歌曲（自动迭代所有页码，一次性返回）"""
-    client = await get_client()
+async def get_songlist_detail_all(songlist_id, request_id="", parallel=True, with_urls=True):
+    """获取歌单全部歌曲（首页得到总数后并发拉取其余页并按页序拼装，parallel=False 时逐页迭代），一次性返回
 
-    logger.info(f"开始获取歌单全部歌曲: songlist_id={songlist_id}")
+    with_urls=False 时跳过播放链接回填（只需元数据的场景，如歌单增量同步）
+    """
+    client = await get_client()
 
-    all_songs = []
-    total = 0
-    page_count = 0
+    logger.info(f"开始获取歌单全部歌曲: songlist_id={songlist_id} parallel={parallel}")
 
+    failed_pages = []
     try:
-        pager = client.songlist.get_detail(songlist_id, num=100).paginate()
-
-        async for page in pager:
-            page_count += 1
-            if page_count > SONGLIST_MAX_PAGES:
-                logger.warning(
-                    f"歌单页数超过上限，截断返回: songlist_id={songlist_id} max_pages={SONGLIST_MAX_PAGES}"
-                )
-                break
-            for song in page.songs:
-                all_songs.append(_build_songlist_item(song))
-            total = page.total or total
+        if parallel:
+            pages, total, failed_pages = await _fetch_pages_parallel(
+                lambda page: _fetch_songlist_page(client, songlist_id, page), f"songlist_id={songlist_id}"
+            )
+        else:
+            pages, total = await _fetch_songlist_pages_sequential(client, songlist_id)
     except ServiceException:
         raise
     except (LoginExpiredError, NotLoginError, RatelimitedError) as exc:
@@ -137,32 +215,97 @@ async def get_songlist_detail_all(songlist_id, request_id=""):
         logger.error(f"获取歌单全部歌曲失败: songlist_id={songlist_id}", exc_info=True)
         raise ServiceException(ErrorCode.AI_SERVICE_ERROR, "服务调用失败，请稍后重试")
 
-    # 一次性批量获取所有歌曲的播放 URL，按 mid 映射回填
-    mids = [s.songMid for s in all_songs if s.songMid]
-    if mids:
-        try:
-            url_items = await get_song_url_list_v2(mids, request_id)
-            url_list = url_items.result if url_items and url_items.result else []
-            url_by_mid = {mid: item for mid, item in zip(mids, url_list)}
-            for song in all_songs:
-                url_item = url_by_mid.get(song.songMid)
-                if url_item and url_item.url:
-                    song.songUrl = SongUrlInfo(
-                        url=url_item.url,
-                        urlType=url_item.urlType or "mp3",
-                    )
-        except Exception:
-            logger.warning(f"批量获取歌单歌曲 URL 失败: songlist_id={songlist_id}")
+    records = [_song_record(_build_songlist_item(song), song) for songs in pages for song in songs]
+    await _remember_songs(records)
+    all_songs = [record.item for record in records]
+
+    if with_urls:
+        await _fill_song_urls(all_songs, request_id, f"songlist_id={songlist_id}")
 
     return PlaylistSongsResponse(
         result=all_songs,
         total=total or len(all_songs),
         requestId=request_id,
+        failedPages=failed_pages,
     )
 
 
+async def stream_songlist_detail_all(songlist_id, request_id="", stream_format="ndjson"):
+    """流式获取歌单全部歌曲：首页同步拉取（错误按普通响应返回），之后逐页推送歌曲、逐块推送播放链接补丁
+
+    不在内存中累积整张歌单，因此不受 SONGLIST_MAX_PAGES 限制；返回已编码的字节流（NDJSON 或 SSE）
+    """
+    client = await get_client()
+
+    logger.info(f"开始流式获取歌单全部歌曲: songlist_id={songlist_id}")
+
+    try:
+        first_page = await _fetch_songlist_page(client, songlist_id, 1)
+    except ServiceException:
+        raise
+    except (LoginExpiredError, NotLoginError, RatelimitedError) as exc:
+        raise _convert_credential_error(exc) from exc
+    except Exception:
+        logger.error(f"获取歌单全部歌曲失败: songlist_id={songlist_id}", exc_info=True)
+        raise ServiceException(ErrorCode.AI_SERVICE_ERROR, "服务调用失败，请稍后重试")
+
+    events = _iter_songlist_events(client, songlist_id, first_page, request_id)
+    return encode_stream_events(events, stream_format)
+
+
 async def search_by_keyword(keyword, page, page_size, request_id=""):
-    """通过关键词搜索歌曲"""
+    """通过关键词搜索歌曲（按归一化关键词/页码/每页数量缓存，返回后后台预取下一页）"""
+    cache_key = (_normalize_keyword(keyword), page, page_size)
+    result = search_cache.get(cache_key)
+    if result is None:
+        result = await _search_upstream(keyword, page, page_size)
+        search_cache.set(cache_key, result)
+
+    if page * page_size < result.total:
+        _schedule_search_prefetch(keyword, page + 1, page_size)
+    return result.model_copy(update={"requestId": request_id})
+
+
+async def stream_batch_keyword_search(keywords, page_size, request_id="", stream_format="ndjson"):
+    """批量关键词搜索：限流并发逐个搜索（不经共享搜索缓存），每个关键词完成即推送结果（NDJSON 或 SSE）"""
+    logger.info(f"开始批量关键词搜索: count={len(keywords)}")
+    events = _iter_batch_search_events(keywords, page_size, request_id)
+    return encode_stream_events(events, stream_format)
+
+
+class KeywordSearchThrottle:
+    """批量场景共用的搜索退避：上游限流时所有并发任务一起暂停，退避时间指数增长，任一请求成功后复位"""
+
+    def __init__(self):
+        self._resume_at = 0.0
+        self._backoff = 0.0
+
+    async def search(self, keyword, page_size, request_id=""):
+        """搜索第一页，被限流时退避重试，超过 BATCH_SEARCH_MAX_RETRIES 次抛出限流异常
+
+        直接请求上游，不读写共享搜索缓存、不预取下一页，避免成批关键词挤掉交互搜索的缓存
+        """
+        for attempt in range(BATCH_SEARCH_MAX_RETRIES + 1):
+            wait = self._resume_at - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                result = await _search_upstream(keyword, 1, page_size)
+            except ServiceException as exc:
+                if exc.code != ErrorCode.RATE_LIMITED or attempt == BATCH_SEARCH_MAX_RETRIES:
+                    raise
+                self._backoff = min(
+                    self._backoff * 2 or BATCH_SEARCH_BACKOFF_BASE_SECONDS, BATCH_SEARCH_BACKOFF_MAX_SECONDS
+                )
+                self._resume_at = max(self._resume_at, time.monotonic() + self._backoff)
+                logger.warning(f"批量搜索被限流，退避 {self._backoff}s: keyword={keyword}")
+                continue
+            self._backoff = 0.0
+            return result.model_copy(update={"requestId": request_id})
+
+
+async def _search_upstream(keyword, page, page_size):
+    """向上游发起关键词搜索"""
     client = await get_client()
 
     try:
@@ -182,8 +325,53 @@ async def search_by_keyword(keyword, page, page_size, request_id=""):
         logger.error(f"关键词搜索失败: keyword={keyword}", exc_info=True)
         raise ServiceException(ErrorCode.AI_SERVICE_ERROR, "服务调用失败，请稍后重试")
 
-    items = [_build_from_search_song(song) for song in result.song]
-    return SearchResponse(result=items, total=result.total_num, requestId=request_id)
+    records = [_song_record(_build_from_search_song(song), song) for song in result.song]
+    await _remember_songs(records)
+    items = [record.item for record in records]
+    return SearchResponse(result=items, total=result.total_num)
+
+
+async def suggest_keywords(keyword, session_key="", request_id=""):
+    """搜索词补全：按归一化前缀缓存；同一会话的新请求取消旧的在途上游调用，被取代的请求返回 superseded"""
+    response = SuggestResponse(requestId=request_id, keyword=keyword)
+    normalized = _normalize_keyword(keyword)
+
+    previous = _suggest_tasks.pop(session_key, None) if session_key else None
+    if previous is not None and not previous.done():
+        previous.cancel()
+
+    if not normalized:
+        return response
+    cached = suggest_cache.get(normalized)
+    if cached is not None:
+        response.suggestions = cached
+        return response
+
+    task = asyncio.create_task(_fetch_suggestions(keyword.strip()))
+    if session_key:
+        _suggest_tasks[session_key] = task
+    try:
+        suggestions = await task
+    except asyncio.CancelledError:
+        if task.cancelled() and not asyncio.current_task().cancelling():
+            response.superseded = True
+            return response
+        raise
+    finally:
+        if session_key and _suggest_tasks.get(session_key) is task:
+            del _suggest_tasks[session_key]
+
+    suggest_cache.set(normalized, suggestions)
+    response.suggestions = suggestions
+    return response
+
+
+async def search_local_songs(keyword, limit=50, request_id=""):
+    """在本地索引（元数据库中见过的歌曲）中检索，不请求上游；命中歌曲的元数据从元数据库读取"""
+    mids = await asyncio.to_thread(local_song_index.search, keyword, limit)
+    song_by_mid = await asyncio.to_thread(song_metadata_store.get_by_mids, mids) if mids else {}
+    items = [song_by_mid[mid] for mid in mids if mid in song_by_mid]
+    return SearchResponse(result=items, total=len(items), requestId=request_id)
 
 
 def get_album_covers(album_mid_list, request_id=""):
@@ -192,33 +380,27 @@ def get_album_covers(album_mid_list, request_id=""):
     return AlbumImgResponse(requestId=request_id, result=urls)
 
 
-async def get_song_url_list_v2(song_mid_list, request_id=""):
-    """获取歌曲链接，有凭证→FLAC，失败降级→ACC_96匿名试听"""
+async def get_song_url_list_v2(
+    song_mid_list, request_id="", max_quality="flac", min_ttl=SONG_URL_REFRESH_AHEAD_SECONDS
+):
+    """获取歌曲链接，按音质阶梯逐级协商（不超过 max_quality），无凭证仅 ACC_96 试听
+
+    剩余有效期不少于 min_ttl 秒的缓存链接直接复用，其余 mid 重新请求上游
+    """
     try:
         credential = get_credential()
     except ServiceException:
-        items = await _try_get_trial_urls(song_mid_list)
-        return SongUrlResponse(requestId=request_id, result=items)
-
-    items = await _try_get_flac_urls(song_mid_list, credential)
-    if items is not None:
-        # 部分歌曲 FLAC 不可用时降级为试听
-        missing_mids = []
-        for i, item in enumerate(items):
-            if not item.url and i < len(song_mid_list):
-                missing_mids.append(song_mid_list[i])
-        if missing_mids:
-            trial_items = await _try_get_trial_urls(missing_mids)
-            trial_idx = 0
-            for i, item in enumerate(items):
-                if not item.url and trial_idx < len(trial_items):
-                    items[i] = trial_items[trial_idx]
-                    trial_idx += 1
-        return SongUrlResponse(requestId=request_id, result=items)
-
-    # FLAC 全部失败 → 匿名试听
-    logger.warning("FLAC 获取失败，降级到 ACC_96 试听")
-    items = await _try_get_trial_urls(song_mid_list)
+        credential = None
+
+    ladder = _build_quality_ladder(max_quality, credential)
+    url_by_mid = _get_cached_song_urls(song_mid_list, ladder, credential, min_ttl)
+    pending_mids = list(dict.fromkeys(mid for mid in song_mid_list if mid not in url_by_mid))
+    if pending_mids:
+        resolved, unavailable = await _resolve_song_urls(pending_mids, credential, ladder)
+        _cache_song_urls(resolved, unavailable, ladder, credential)
+        url_by_mid.update(resolved)
+
+    items = [url_by_mid.get(mid) or SongUrlItem(url="", urlType="mp3") for mid in song_mid_list]
     return SongUrlResponse(requestId=request_id, result=items)
 
 
@@ -277,34 +459,174 @@ async def get_user_liked_songs(page=1, page_size=20):
         logger.error("获取用户喜欢歌曲失败", exc_info=True)
         raise ServiceException(ErrorCode.AI_SERVICE_ERROR, "服务调用失败，请稍后重试")
 
-    items = [_build_songlist_item(song) for song in result.songs]
+    records = [_song_record(_build_songlist_item(song), song) for song in result.songs]
+    await _remember_songs(records)
+    items = [record.item for record in records]
     return LikedSongsResponse(result=items, total=result.total)
 
 
+async def get_user_liked_songs_all(request_id="", refresh=False):
+    """获取当前登录用户全部喜欢歌曲（首页取总数后并发拉取其余页并批量回填链接），按 encrypt_uin 短时缓存
+
+    refresh=True 时丢弃缓存重新拉取
+    """
+    credential = get_credential()
+
+    if not credential.encrypt_uin:
+        raise ServiceException(ErrorCode.NOT_LOGGED_IN, "未登录")
+
+    cache_key = credential.encrypt_uin
+    if refresh:
+        liked_songs_cache.pop(cache_key)
+    cached = liked_songs_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    client = await get_client()
+
+    try:
+        pages, total, failed_pages = await _fetch_pages_parallel(
+            lambda page: client.execute(
+                client.user.get_fav_song(euin=credential.encrypt_uin, page=page, num=SONGLIST_PAGE_SIZE)
+            ),
+            "liked",
+        )
+    except ServiceException:
+        raise
+    except (LoginExpiredError, NotLoginError, RatelimitedError) as exc:
+        raise _convert_credential_error(exc) from exc
+    except Exception:
+        logger.error("获取用户全部喜欢歌曲失败", exc_info=True)
+        raise ServiceException(ErrorCode.AI_SERVICE_ERROR, "服务调用失败，请稍后重试")
+
+    records = [_song_record(_build_songlist_item(song), song) for songs in pages for song in songs]
+    await _remember_songs(records)
+    items = [record.item for record in records]
+    await _fill_song_urls(items, request_id, "liked")
+
+    result = LikedSongsResponse(result=items, total=total or len(items), failedPages=failed_pages)
+    if not failed_pages:
+        liked_songs_cache.set(cache_key, result)
+    return result
+
+
+def invalidate_user_liked_cache():
+    """丢弃当前用户的全部喜欢歌曲缓存（收藏变化后由客户端调用）"""
+    try:
+        credential = get_credential()
+    except ServiceException:
+        return
+    if credential.encrypt_uin:
+        liked_songs_cache.pop(credential.encrypt_uin)
+
+
 async def get_song_download_bundle(song_mid, request_id=""):
     """获取歌曲下载元数据包（详情+歌词+下载链接，三段网络请求并行）"""
     client = await get_client()
 
-    detail, lyrics, song_url = await asyncio.gather(
+    detail, lyrics, url_by_mid = await asyncio.gather(
         _fetch_bundle_detail(client, song_mid),
         _fetch_bundle_lyrics(client, song_mid),
-        _fetch_bundle_song_url(song_mid, request_id),
+        _fetch_bundle_song_urls([song_mid], request_id),
     )
 
     track = detail.track
-    album_info = _build_album_info(track)
+    await _remember_songs([_song_record(_build_single_song_item(track.id, detail), track)], with_detail=True)
+    return _build_download_bundle(song_mid, detail, lyrics, url_by_mid[song_mid])
 
-    return SongDownloadBundleResponse(
-        songMid=song_mid,
-        songName=track.title or "",
-        singer=_build_singer(track),
-        album=AlbumInfo(**album_info),
-        trackNumber=track.index_album or 0,
-        genre=_safe_get_genre(detail),
-        year=track.time_public or "",
-        duration=track.interval or 0,
-        lyrics=lyrics,
-        songUrl=song_url,
+
+async def get_song_download_bundles(song_mid_list, request_id=""):
+    """批量获取下载元数据包：下载链接一次批量协商，详情与歌词限流并发获取；按请求顺序返回，单首失败只影响该首"""
+    client = await get_client()
+    semaphore = asyncio.Semaphore(settings.download_bundle_concurrency)
+    unique_mids = list(dict.fromkeys(song_mid_list))
+
+    async def fetch_one(song_mid):
+        async with semaphore:
+            return await asyncio.gather(_fetch_bundle_detail(client, song_mid), _fetch_bundle_lyrics(client, song_mid))
+
+    fetched, url_by_mid = await asyncio.gather(
+        asyncio.gather(*(fetch_one(mid) for mid in unique_mids), return_exceptions=True),
+        _fetch_bundle_song_urls(unique_mids, request_id),
+    )
+
+    item_by_mid = {}
+    records = []
+    for song_mid, result in zip(unique_mids, fetched):
+        if isinstance(result, ServiceException):
+            item_by_mid[song_mid] = SongDownloadBundleBatchItem(
+                songMid=song_mid, code=result.code, message=result.message
+            )
+            continue
+        if isinstance(result, BaseException):
+            logger.error(f"获取下载元数据包失败: song_mid={song_mid}", exc_info=result)
+            item_by_mid[song_mid] = SongDownloadBundleBatchItem(
+                songMid=song_mid, code=ErrorCode.AI_SERVICE_ERROR, message="服务调用失败，请稍后重试"
+            )
+            continue
+        detail, lyrics = result
+        records.append(_song_record(_build_single_song_item(detail.track.id, detail), detail.track))
+        item_by_mid[song_mid] = SongDownloadBundleBatchItem(
+            songMid=song_mid, bundle=_build_download_bundle(song_mid, detail, lyrics, url_by_mid[song_mid])
+        )
+    await _remember_songs(records, with_detail=True)
+
+    items = [item_by_mid[mid] for mid in song_mid_list]
+    failed = sum(1 for item in items if item.code != ErrorCode.SUCCESS)
+    logger.info(f"批量获取下载元数据包完成: count={len(items)} failed={failed}")
+    return SongDownloadBundleBatchResponse(requestId=request_id, result=items, failed=failed)
+
+
+async def get_song_lyrics(song_mid, request_id=""):
+    """获取歌词原文/翻译/音译：优先读本地歌词缓存，未命中时请求上游并写入缓存"""
+    client = await get_client()
+    entry = await _load_lyrics(client, song_mid)
+    return LyricsResponse(
+        requestId=request_id, songMid=song_mid, lyric=entry.lyric, trans=entry.trans, roma=entry.roma
+    )
+
+
+async def get_structured_lyrics(song_mid, request_id=""):
+    """获取结构化歌词：按时间排序的行（原文/翻译/音译，上游有逐字歌词时带逐字时间），每个 mid 解析一次后缓存"""
+    result = structured_lyrics_cache.get(song_mid)
+    if result is None:
+        client = await get_client()
+        entry, qrc_text = await asyncio.gather(
+            _load_lyrics(client, song_mid), _load_word_timed_lyrics(client, song_mid)
+        )
+        result = await asyncio.to_thread(_build_structured_lyrics, song_mid, entry, qrc_text)
+        structured_lyrics_cache.set(song_mid, result)
+    return result.model_copy(update={"requestId": request_id})
+
+
+async def prefetch_song_lyrics(song_mid_list, playlist_id=0, request_id=""):
+    """后台把歌词预取到本地缓存（指定 mid 与/或歌单全部歌曲），立即返回已缓存数与新排队数"""
+    song_mid_list = list(song_mid_list)
+    if playlist_id:
+        detail = await get_songlist_detail_all(playlist_id, request_id=request_id, with_urls=False)
+        song_mid_list.extend(song.songMid for song in detail.result)
+    mids = [mid for mid in dict.fromkeys(song_mid_list) if MID_PATTERN.match(mid or "")]
+    if not mids:
+        raise ServiceException(ErrorCode.PARAM_ERROR, "没有可预取的歌曲")
+
+    cached = await asyncio.to_thread(lambda: {mid for mid in mids if lyrics_store.get(mid) is not None})
+    pending = [mid for mid in mids if mid not in cached and mid not in _lyrics_prefetching]
+    if pending:
+        _lyrics_prefetching.update(pending)
+        task = asyncio.create_task(_prefetch_lyrics(pending))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+    logger.info(f"歌词预取: total={len(mids)} cached={len(cached)} scheduled={len(pending)}")
+    return LyricsPrefetchResponse(requestId=request_id, total=len(mids), cached=len(cached), scheduled=len(pending))
+
+
+def get_backend_stats():
+    """获取后端运行统计（请求合并命中、CDN 节点得分等）"""
+    return BackendStatsResponse(
+        requestCoalescing=CoalesceStats(**get_coalesce_stats()),
+        cdnHosts=[CdnHostStats(**item) for item in cdn_selector.stats()],
+        searchCache=CacheStats(**search_cache.stats()),
     )
 
 
@@ -336,89 +658,494 @@ async def _fetch_bundle_detail(client, song_mid):
 async def _fetch_bundle_lyrics(client, song_mid):
     """获取歌词文本（含翻译/音译），失败降级为空字符串"""
     try:
-        lyric_result = await client.execute(client.lyric.get_lyric(song_mid, trans=True, roma=True))
-        if not lyric_result:
-            return ""
-        decrypted = lyric_result.decrypt()
-        lyrics = decrypted.lyric or ""
-        if decrypted.trans:
-            lyrics += "\n\n" + decrypted.trans
-        if decrypted.roma:
-            lyrics += "\n\n" + decrypted.roma
-        return lyrics
+        return (await _load_lyrics(client, song_mid)).to_text()
     except Exception:
         logger.warning(f"获取歌词失败: song_mid={song_mid}")
         return ""
 
 
-async def _fetch_bundle_song_url(song_mid, request_id):
-    """获取歌曲下载链接，失败降级为空链接"""
+async def _load_lyrics(client, song_mid, qrc=False):
+    """读本地歌词缓存，未命中时请求上游，在线程池解密后写入缓存
+
+    qrc=False 取逐行歌词（含翻译/音译）；qrc=True 取逐字歌词，QRC 文本存于 lyric 字段
+    """
+    if not MID_PATTERN.match(song_mid or ""):
+        raise ServiceException(ErrorCode.PARAM_ERROR, "歌曲 MID 无效")
+    kind = "qrc" if qrc else "lrc"
+    entry = await asyncio.to_thread(lyrics_store.get, song_mid, kind)
+    if entry is not None:
+        return entry
+
+    if qrc:
+        request = client.lyric.get_lyric(song_mid, qrc=True)
+    else:
+        request = client.lyric.get_lyric(song_mid, trans=True, roma=True)
     try:
-        url_items = await get_song_url_list_v2([song_mid], request_id)
-        if url_items and url_items.result and url_items.result[0]:
-            return SongUrlInfo(
-                url=url_items.result[0].url or "",
-                urlType=url_items.result[0].urlType or "mp3",
-            )
+        lyric_result = await client.execute(request)
+    except ServiceException:
+        raise
+    except (LoginExpiredError, NotLoginError, RatelimitedError) as exc:
+        raise _convert_credential_error(exc) from exc
     except Exception:
-        logger.warning(f"获取下载链接失败: song_mid={song_mid}")
-    return SongUrlInfo()
+        logger.error(f"获取歌词失败: song_mid={song_mid} kind={kind}", exc_info=True)
+        raise ServiceException(ErrorCode.AI_SERVICE_ERROR, "获取歌词失败")
 
+    entry = LyricsEntry()
+    if lyric_result:
+        decrypted = await asyncio.to_thread(lyric_result.decrypt)
+        entry = LyricsEntry(lyric=decrypted.lyric or "", trans=decrypted.trans or "", roma=decrypted.roma or "")
+    try:
+        await asyncio.to_thread(lyrics_store.put, song_mid, entry, kind)
+    except OSError:
+        logger.warning(f"写入歌词缓存失败: song_mid={song_mid}", exc_info=True)
+    return entry
 
-async def _try_get_flac_urls(song_mid_list, credential):
-    """尝试获取 FLAC 无损链接，失败返回 None"""
-    client = await get_client()
-    file_info = [SongFileInfo(mid=mid) for mid in song_mid_list]
+
+async def _load_word_timed_lyrics(client, song_mid):
+    """逐字歌词可能需要特定权限或上游未收录，失败降级为空（结构化歌词退回逐行时间）"""
     try:
-        flac_result = await client.execute(
-            client.song.get_song_urls(
-                file_info=file_info,
-                file_type=SongFileType.FLAC,
-                credential=credential,
-            )
-        )
+        return (await _load_lyrics(client, song_mid, qrc=True)).lyric
+    except ServiceException as exc:
+        if exc.code in (ErrorCode.NOT_LOGGED_IN, ErrorCode.TOKEN_EXPIRED, ErrorCode.RATE_LIMITED):
+            raise
+        logger.warning(f"获取逐字歌词失败，退回逐行歌词: song_mid={song_mid}")
+        return ""
+
+
+def _build_structured_lyrics(song_mid, entry, qrc_text):
+    lines = build_lyric_lines(entry.lyric, entry.trans, entry.roma, qrc_text)
+    return StructuredLyricsResponse(
+        songMid=song_mid,
+        lines=lines,
+        hasTranslation=any(line.trans for line in lines),
+        hasRoma=any(line.roma for line in lines),
+        hasWordTiming=any(line.words for line in lines),
+    )
+
+
+async def _prefetch_lyrics(song_mid_list):
+    """限流并发预取歌词，单首失败只记日志"""
+    semaphore = asyncio.Semaphore(settings.lyrics_prefetch_concurrency)
+
+    async def prefetch_one(client, song_mid):
+        async with semaphore:
+            try:
+                await _load_lyrics(client, song_mid)
+            except Exception:
+                logger.warning(f"预取歌词失败: song_mid={song_mid}")
+
+    try:
+        client = await get_client()
+        await asyncio.gather(*(prefetch_one(client, mid) for mid in song_mid_list))
     except Exception:
-        logger.error("FLAC 获取失败", exc_info=True)
-        return None
+        logger.warning("歌词预取任务异常", exc_info=True)
+    finally:
+        _lyrics_prefetching.difference_update(song_mid_list)
 
-    url_map = {}
-    for item in flac_result.data:
-        url = f"{CDN_DOMAIN}{item.purl}" if item.purl and getattr(item, "result", 0) == 0 else ""
-        url_map[item.mid] = url
-    return _build_ordered_url_items(song_mid_list, url_map)
+
+async def _fetch_bundle_song_urls(song_mid_list, request_id):
+    """批量获取下载链接（一次音质协商），返回 mid → SongUrlInfo；失败降级为空链接"""
+    url_by_mid = {mid: SongUrlInfo() for mid in song_mid_list}
+    try:
+        url_items = await get_song_url_list_v2(song_mid_list, request_id)
+    except Exception:
+        logger.warning(f"获取下载链接失败: count={len(song_mid_list)}")
+        return url_by_mid
+    for mid, item in zip(song_mid_list, url_items.result):
+        if item:
+            url_by_mid[mid] = SongUrlInfo(url=item.url or "", urlType=item.urlType or "mp3")
+    return url_by_mid
+
+
+def _build_download_bundle(song_mid, detail, lyrics, song_url):
+    track = detail.track
+    return SongDownloadBundleResponse(
+        songMid=song_mid,
+        songName=track.title or "",
+        singer=_build_singer(track),
+        album=AlbumInfo(**_build_album_info(track)),
+        trackNumber=track.index_album or 0,
+        genre=_safe_get_genre(detail),
+        year=track.time_public or "",
+        duration=track.interval or 0,
+        lyrics=lyrics,
+        songUrl=song_url,
+    )
 
 
-async def _try_get_trial_urls(song_mid_list):
-    """通过全局客户端请求 ACC_96 试听链接（复用已有登录凭证）"""
+async def _fetch_suggestions(keyword):
+    """调用上游补全接口，提取去重后的提示词"""
     client = await get_client()
-    file_info = [SongFileInfo(mid=mid) for mid in song_mid_list]
 
     try:
-        result = await client.execute(
-            client.song.get_song_urls(
-                file_info=file_info,
-                file_type=SongFileType.ACC_96,
-            )
-        )
+        result = await client.execute(client.search.complete(keyword))
+    except ServiceException:
+        raise
+    except (LoginExpiredError, NotLoginError, RatelimitedError) as exc:
+        raise _convert_credential_error(exc) from exc
     except Exception:
-        logger.warning("ACC_96 试听获取失败（部分歌曲可能没有 FLAC 且试听不可用）")
-        return [SongUrlItem(url="", urlType="mp3") for _ in song_mid_list]
+        logger.error(f"搜索补全失败: keyword={keyword}", exc_info=True)
+        raise ServiceException(ErrorCode.AI_SERVICE_ERROR, "服务调用失败，请稍后重试")
+
+    items = result.get("items") if isinstance(result, dict) else None
+    hints = (item.get("hint") or item.get("name") or "" for item in items or [] if isinstance(item, dict))
+    return list(dict.fromkeys(hint.strip() for hint in hints if hint and hint.strip()))[:SUGGEST_MAX_ITEMS]
+
+
+def _normalize_keyword(keyword):
+    """全半角统一、忽略大小写并合并空白，作为搜索缓存键"""
+    return " ".join(unicodedata.normalize("NFKC", keyword).casefold().split())
+
+
+def _schedule_search_prefetch(keyword, page, page_size):
+    """后台预取下一页写入搜索缓存；已缓存或已在预取中则跳过"""
+    cache_key = (_normalize_keyword(keyword), page, page_size)
+    if cache_key in search_cache or cache_key in _search_prefetching:
+        return
+
+    async def prefetch():
+        try:
+            search_cache.set(cache_key, await _search_upstream(keyword, page, page_size))
+        except Exception as exc:
+            logger.info(f"搜索下一页预取失败: keyword={keyword} page={page} error={exc}")
+        finally:
+            _search_prefetching.discard(cache_key)
+
+    _search_prefetching.add(cache_key)
+    task = asyncio.create_task(prefetch())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def _fill_song_urls(items, request_id, label):
+    """一次性批量获取所有歌曲的播放 URL，按 mid 映射回填；失败时保留空链接"""
+    mids = [item.songMid for item in items if item.songMid]
+    if not mids:
+        return
+    try:
+        url_items = await get_song_url_list_v2(mids, request_id)
+    except Exception:
+        logger.warning(f"批量获取歌曲 URL 失败: {label}")
+        return
+    url_by_mid = {mid: item for mid, item in zip(mids, url_items.result)}
+    for song in items:
+        url_item = url_by_mid.get(song.songMid)
+        if url_item and url_item.url:
+            song.songUrl = SongUrlInfo(url=url_item.url, urlType=url_item.urlType or "mp3")
+
+
+async def _fetch_songlist_page(client, songlist_id, page):
+    """拉取歌单单页原始数据"""
+    return await client.execute(client.songlist.get_detail(songlist_id, num=SONGLIST_PAGE_SIZE, page=page))
+
+
+async def _fetch_pages_parallel(fetch_page, label):
+    """首页取得总数后限流并发拉取其余页；并发失败的页顺序重试一次，仍失败记入失败页码
+
+    fetch_page(page) 返回含 total/songs 的单页响应；返回 (按页序排列的歌曲列表, 总数, 失败页码)
+    """
+    first_page = await fetch_page(1)
+    total = first_page.total or 0
+    page_total = math.ceil(total / SONGLIST_PAGE_SIZE)
+    if page_total > SONGLIST_MAX_PAGES:
+        logger.warning(f"分页数超过上限，截断返回: {label} max_pages={SONGLIST_MAX_PAGES}")
+        page_total = SONGLIST_MAX_PAGES
+
+    semaphore = asyncio.Semaphore(settings.songlist_page_concurrency)
+
+    async def fetch_rest_page(page):
+        async with semaphore:
+            try:
+                return (await fetch_page(page)).songs
+            except Exception as exc:
+                logger.warning(f"分页获取失败，稍后重试: {label} page={page} error={exc}")
+                return None
+
+    rest_pages = list(range(2, page_total + 1))
+    results = await asyncio.gather(*(fetch_rest_page(page) for page in rest_pages))
+
+    pages = [first_page.songs]
+    failed_pages = []
+    for page, songs in zip(rest_pages, results):
+        if songs is None:
+            try:
+                songs = (await fetch_page(page)).songs
+            except Exception:
+                logger.error(f"分页重试仍失败: {label} page={page}", exc_info=True)
+                failed_pages.append(page)
+                continue
+        pages.append(songs)
+    return pages, total, failed_pages
+
+
+async def _fetch_songlist_pages_sequential(client, songlist_id):
+    """逐页顺序迭代歌单（并发模式的兜底），返回 (按页序排列的歌曲列表, 总数)"""
+    pages = []
+    total = 0
+    pager = client.songlist.get_detail(songlist_id, num=SONGLIST_PAGE_SIZE).paginate()
+    async for page in pager:
+        if len(pages) >= SONGLIST_MAX_PAGES:
+            logger.warning(f"歌单页数超过上限，截断返回: songlist_id={songlist_id} max_pages={SONGLIST_MAX_PAGES}")
+            break
+        pages.append(page.songs)
+        total = page.total or total
+    return pages, total
+
+
+async def _iter_songlist_events(client, songlist_id, first_page, request_id):
+    """歌单流事件：meta → page/urls（按到达顺序交错）→ done；有界队列限制在途页数，内存占用与歌单长度无关"""
+    total = first_page.total or 0
+    page_total = max(math.ceil(total / SONGLIST_PAGE_SIZE), 1)
+    concurrency = settings.songlist_page_concurrency
+    yield {"event": "meta", "requestId": request_id, "total": total, "pageCount": page_total}
+
+    queue = asyncio.Queue(maxsize=concurrency)
+    page_numbers = iter(range(2, page_total + 1))
+    failed_pages = []
+
+    async def emit_page(page, songs):
+        records = [_song_record(_build_songlist_item(song), song) for song in songs]
+        await _remember_songs(records)
+        items = [record.item for record in records]
+        await queue.put(
+            {
+                "event": "page",
+                "page": page,
+                "offset": (page - 1) * SONGLIST_PAGE_SIZE,
+                "songs": [item.model_dump() for item in items],
+            }
+        )
+        mids = [item.songMid for item in items if item.songMid]
+        chunk_size = settings.song_url_chunk_size
+        for start in range(0, len(mids), chunk_size):
+            chunk = mids[start : start + chunk_size]
+            try:
+                url_items = await get_song_url_list_v2(chunk, request_id)
+            except Exception:
+                logger.warning(f"流式获取歌单歌曲 URL 失败: songlist_id={songlist_id} page={page}")
+                continue
+            urls = {
+                mid: SongUrlInfo(url=item.url, urlType=item.urlType or "mp3").model_dump()
+                for mid, item in zip(chunk, url_items.result)
+                if item.url
+            }
+            if urls:
+                await queue.put({"event": "urls", "page": page, "urls": urls})
+
+    async def worker(with_first_page):
+        if with_first_page:
+            await emit_page(1, first_page.songs)
+        for page in page_numbers:
+            try:
+                songs = (await _fetch_songlist_page(client, songlist_id, page)).songs
+            except Exception:
+                logger.warning(f"歌单分页获取失败，重试: songlist_id={songlist_id} page={page}")
+                try:
+                    songs = (await _fetch_songlist_page(client, songlist_id, page)).songs
+                except Exception:
+                    logger.error(f"歌单分页重试仍失败: songlist_id={songlist_id} page={page}", exc_info=True)
+                    failed_pages.append(page)
+                    await queue.put({"event": "error", "page": page, "message": "分页获取失败"})
+                    continue
+            await emit_page(page, songs)
+
+    async def run():
+        try:
+            await asyncio.gather(*(worker(index == 0) for index in range(concurrency)))
+        except Exception:
+            logger.error(f"流式获取歌单异常: songlist_id={songlist_id}", exc_info=True)
+            await queue.put({"event": "error", "page": None, "message": "服务调用失败，请稍后重试"})
+        await queue.put(None)
+
+    runner = asyncio.create_task(run())
+    try:
+        while (event := await queue.get()) is not None:
+            yield event
+        yield {"event": "done", "total": total, "failedPages": sorted(failed_pages)}
+    finally:
+        # 客户端断开时停止继续拉取
+        runner.cancel()
+        with suppress(asyncio.CancelledError):
+            await runner
+
+
+async def _iter_batch_search_events(keywords, page_size, request_id):
+    """批量搜索事件：result/error（带输入下标）按完成顺序推送，最后 done；上游限流时所有并发任务一起退避"""
+    concurrency = settings.batch_search_concurrency
+    queue = asyncio.Queue(maxsize=concurrency)
+    pending = iter(enumerate(keywords))
+    throttle = KeywordSearchThrottle()
+    failed = 0
+
+    async def worker():
+        nonlocal failed
+        for index, keyword in pending:
+            try:
+                if not keyword.strip():
+                    raise ServiceException(ErrorCode.PARAM_ERROR, "关键词为空")
+                result = await throttle.search(keyword, page_size, request_id)
+            except ServiceException as exc:
+                failed += 1
+                await queue.put(
+                    {"event": "error", "index": index, "keyword": keyword, "code": exc.code, "message": exc.message}
+                )
+                continue
+            await queue.put({"event": "result", "index": index, "keyword": keyword, "result": result.model_dump()})
+
+    async def run():
+        try:
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+        except Exception:
+            logger.error("批量关键词搜索异常", exc_info=True)
+            await queue.put({"event": "error", "index": None, "message": "服务调用失败，请稍后重试"})
+        await queue.put(None)
+
+    runner = asyncio.create_task(run())
+    try:
+        while (event := await queue.get()) is not None:
+            yield event
+        yield {"event": "done", "total": len(keywords), "failed": failed}
+    finally:
+        # 客户端断开时停止继续搜索
+        runner.cancel()
+        with suppress(asyncio.CancelledError):
+            await runner
+
+
+async def _resolve_song_urls(song_mid_list, credential, ladder):
+    """沿音质阶梯逐级请求上游，每级只携带仍未解析的 mid
+
+    返回 (mid → SongUrlItem, 每级上游都明确答复无链接的 mid 列表)；分块失败的 mid 不计入后者
+    """
+    resolved = {}
+    unanswered = set()
+    pending_mids = list(song_mid_list)
+    for tier in ladder:
+        if not pending_mids:
+            break
+        url_map, any_success = await _fetch_song_url_chunks(pending_mids, tier.file_type, credential)
+        if not any_success:
+            logger.warning(f"{tier.file_type.name} 获取失败，降级到下一音质: count={len(pending_mids)}")
+            unanswered.update(pending_mids)
+            continue
+
+        unanswered.update(mid for mid in pending_mids if mid not in url_map)
+        for mid in pending_mids:
+            url, expires_at = url_map.get(mid, ("", 0))
+            if url:
+                resolved[mid] = SongUrlItem(
+                    url=url,
+                    urlType=tier.file_type.e.lstrip("."),
+                    expiresAt=expires_at,
+                    quality=tier.quality,
+                    bitrate=tier.bitrate,
+                )
+        pending_mids = [mid for mid in pending_mids if mid not in resolved]
+
+    if pending_mids:
+        logger.warning(f"部分歌曲所有音质均不可用: count={len(pending_mids)}")
+    return resolved, [mid for mid in pending_mids if mid not in unanswered]
 
-    url_map = {}
-    for item in result.data:
-        url = f"{CDN_DOMAIN}{item.purl}" if item.purl and getattr(item, "result", 0) == 0 else ""
-        url_map[item.mid] = url
-    return _build_ordered_url_items(song_mid_list, url_map)
 
+def _build_quality_ladder(max_quality, credential):
+    """按音质上限截取音质阶梯；无凭证时只能获取 ACC_96 试听"""
+    if credential is None:
+        return SONG_QUALITY_LADDER[-1:]
+    for index, tier in enumerate(SONG_QUALITY_LADDER):
+        if tier.quality == max_quality:
+            return SONG_QUALITY_LADDER[index:]
+    raise ServiceException(ErrorCode.PARAM_ERROR, "不支持的音质")
 
-def _build_ordered_url_items(song_mid_list: list[str], url_map: dict[str, str]) -> list[SongUrlItem]:
-    """按输入顺序构建歌曲 URL 结果列表"""
-    items = []
+
+def _credential_identity(credential):
+    """缓存键中的凭证身份，匿名为 0"""
+    return credential.musicid if credential is not None else 0
+
+
+def _get_cached_song_urls(song_mid_list, ladder, credential, min_ttl):
+    """读取剩余有效期不少于 min_ttl 秒的缓存链接，返回 mid → SongUrlItem"""
+    key_type = ladder[0].file_type.s
+    identity = _credential_identity(credential)
+
+    cached = {}
     for mid in song_mid_list:
-        url = url_map.get(mid, "")
-        url_type = "flac" if "flac" in url.lower() else "mp3"
-        items.append(SongUrlItem(url=url or "", urlType=url_type))
-    return items
+        key = (mid, key_type, identity)
+        item = song_url_cache.get(key, min_ttl=min_ttl)
+        if item is not None:
+            cached[mid] = item.model_copy(update={"url": cdn_selector.rewrite(item.url)})
+        elif song_url_unavailable_cache.get(key) is not None:
+            cached[mid] = SongUrlItem(url="", urlType="mp3")
+    return cached
+
+
+def _cache_song_urls(url_by_mid, unavailable_mids, ladder, credential):
+    """以 (mid, 阶梯最高音质, 凭证身份) 为键缓存协商结果，不同音质上限互不串用；无链接的 mid 短期负缓存"""
+    key_type = ladder[0].file_type.s
+    identity = _credential_identity(credential)
+    for mid, item in url_by_mid.items():
+        song_url_cache.set((mid, key_type, identity), item, expires_at=item.expiresAt or None)
+    for mid in unavailable_mids:
+        song_url_unavailable_cache.set((mid, key_type, identity), True)
+
+
+async def _fetch_song_url_chunks(song_mid_list, file_type, credential=None):
+    """按分块大小拆分 mid 并限流并发请求，单块失败只影响本块歌曲
+
+    返回 (mid → (url, 过期时间), 是否至少一个分块成功)
+    """
+    client = await get_client()
+    chunk_size = settings.song_url_chunk_size
+    chunks = [song_mid_list[i : i + chunk_size] for i in range(0, len(song_mid_list), chunk_size)]
+    semaphore = asyncio.Semaphore(settings.song_url_max_concurrency)
+
+    async def fetch_chunk(chunk):
+        async with semaphore:
+            try:
+                return await client.execute(
+                    client.song.get_song_urls(
+                        file_info=[SongFileInfo(mid=mid) for mid in chunk],
+                        file_type=file_type,
+                        credential=credential,
+                    )
+                )
+            except Exception:
+                logger.warning(f"{file_type.name} 分块获取失败: count={len(chunk)}", exc_info=True)
+                return None
+
+    results = await asyncio.gather(*(fetch_chunk(chunk) for chunk in chunks))
+
+    url_map = {}
+    for result in results:
+        if result is None:
+            continue
+        expires_at = _url_expires_at(result)
+        for item in result.data:
+            url = cdn_selector.build_url(item.purl) if item.purl and getattr(item, "result", 0) == 0 else ""
+            url_map[item.mid] = (url, expires_at if url else 0)
+    return url_map, any(result is not None for result in results)
+
+
+def _url_expires_at(url_result) -> int:
+    """由 vkey 有效期（响应 expiration 秒数）计算链接过期的 Unix 时间，未知返回 0"""
+    expiration = getattr(url_result, "expiration", 0) or 0
+    return int(time.time()) + expiration if expiration > 0 else 0
+
+
+def _song_record(item, track):
+    """附带原始歌手列表，供元数据库归一化歌手"""
+    return SongRecord(item=item, singers=[(singer.mid, singer.id, singer.name) for singer in track.singer])
+
+
+async def _remember_songs(records, with_detail=False):
+    """写穿本地元数据库（一个事务批量写入）并登记到本地搜索索引（后台合入）；失败只记日志，不影响接口返回"""
+    if not records:
+        return
+    try:
+        await asyncio.to_thread(song_metadata_store.upsert_songs, records, with_detail)
+    except Exception:
+        logger.warning("写入本地歌曲元数据失败", exc_info=True)
+        return
+    local_song_index.submit([record.item for record in records])
 
 
 def _safe_get_genre(detail):
@@ -0,0 +1,88 @@
+"""播放队列歌曲链接预取：后台提前解析即将播放的歌曲，并在 vkey 过期前续期"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+from app.core.config import settings
+from app.schemas.qqmusic import PlayQueueResponse
+from app.services.qqmusic import get_song_url_list_v2
+from app.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# 预取续期阈值需大于 /song/song-url 的复用阈值，保证交互请求读到的缓存始终新鲜
+PREFETCH_REFRESH_AHEAD_SECONDS = 600
+PREFETCH_RETRY_SECONDS = 60
+PREFETCH_IDLE_SECONDS = 3600
+
+_queue_mids: list[str] = []
+_queue_max_quality = "flac"
+_queue_changed = asyncio.Event()
+_interactive_idle = asyncio.Event()
+_interactive_idle.set()
+_interactive_count = 0
+
+
+def register_play_queue(song_mid_list, current_index=0, max_quality="flac"):
+    """登记播放队列，截取当前曲目起的 N 首作为预取窗口并唤醒后台任务"""
+    global _queue_mids, _queue_max_quality
+
+    window = song_mid_list[current_index : current_index + settings.song_url_prefetch_ahead]
+    _queue_mids = list(dict.fromkeys(mid for mid in window if mid))
+    _queue_max_quality = max_quality
+    _queue_changed.set()
+    return PlayQueueResponse(total=len(song_mid_list), prefetchCount=len(_queue_mids))
+
+
+@asynccontextmanager
+async def interactive_request():
+    """标记交互请求进行中；预取只在没有交互请求时发起上游调用"""
+    global _interactive_count
+
+    _interactive_count += 1
+    _interactive_idle.clear()
+    try:
+        yield
+    finally:
+        _interactive_count -= 1
+        if _interactive_count == 0:
+            _interactive_idle.set()
+
+
+async def song_url_prefetch_loop() -> None:
+    """队列变化时立即预取，之后在最早过期前续期；任务取消时正常退出"""
+    while True:
+        _queue_changed.clear()
+        delay = PREFETCH_IDLE_SECONDS
+        if _queue_mids:
+            try:
+                delay = await _prefetch_song_urls(list(_queue_mids), _queue_max_quality)
+            except Exception:
+                logger.warning("播放队列链接预取失败", exc_info=True)
+                delay = PREFETCH_RETRY_SECONDS
+
+        try:
+            await asyncio.wait_for(_queue_changed.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def _prefetch_song_urls(song_mid_list, max_quality):
+    """等待交互请求空闲后解析/续期预取窗口内的链接，返回距下次续期的秒数"""
+    await _interactive_idle.wait()
+    response = await get_song_url_list_v2(
+        song_mid_list,
+        request_id="prefetch",
+        max_quality=max_quality,
+        min_ttl=PREFETCH_REFRESH_AHEAD_SECONDS,
+    )
+
+    resolved = [item for item in response.result if item.url]
+    if not resolved:
+        # 整窗失败多为上游异常，稍后重试；个别无版权歌曲不单独重试，避免反复请求整条音质阶梯
+        return PREFETCH_RETRY_SECONDS
+
+    expires = [item.expiresAt for item in resolved if item.expiresAt]
+    if not expires:
+        return PREFETCH_IDLE_SECONDS
+    return max(min(expires) - PREFETCH_REFRESH_AHEAD_SECONDS - time.time(), PREFETCH_RETRY_SECONDS)
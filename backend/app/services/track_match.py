@@ -0,0 +1,229 @@
+"""本地音轨匹配在线歌曲：规范化标题/歌手后按关键词取候选，整批向量化打分（标题/歌手字符相似度 + 时长差），给出最佳 songMid 与置信度"""
+import asyncio
+import re
+import unicodedata
+from contextlib import suppress
+from functools import lru_cache
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.qqmusic import KeywordSearchThrottle
+from app.utils.exception import ServiceException
+from app.utils.logger import setup_logger
+from app.utils.stream import encode_stream_events
+
+logger = setup_logger(__name__)
+
+MATCH_CHUNK_SIZE = 50
+MATCH_CANDIDATES = 10
+MATCH_THRESHOLD = 0.6
+# 标题/歌手/时长权重；本地缺歌手或任一侧缺时长时，该项权重按比例分给其余项
+SCORE_WEIGHTS = (0.55, 0.3, 0.15)
+# 去掉括号内容后的标题相似度为主，原标题相似度用于区分 Live/伴奏 等版本
+CLEAN_TITLE_WEIGHT = 0.8
+# 时长差在宽限内记满分，之后按指数衰减
+DURATION_GRACE_SECONDS = 2
+DURATION_DECAY_SECONDS = 8
+FEATURE_DIM = 1024
+
+_BRACKETED = re.compile(r"\([^()]*\)|\[[^\[\]]*\]|\{[^{}]*\}|【[^【】]*】|〔[^〔〕]*〕")
+_FEAT = re.compile(r"(?:^|\s)(?:feat|ft|featuring)(?:\.|\s).*$")
+_NON_WORD = re.compile(r"[^\w]+")
+_ARTIST_SEPARATORS = re.compile(r"\s*(?:/|&|,|;|、|\+|\s(?:feat|ft|featuring)\.?\s|\s(?:and|with|x)\s)\s*")
+
+
+async def stream_track_matches(tracks, request_id="", stream_format="ndjson"):
+    """批量匹配本地音轨，按输入顺序逐条推送 match/error 事件，最后 done（NDJSON 或 SSE）"""
+    logger.info(f"开始本地音轨匹配: count={len(tracks)}")
+    events = _iter_match_events(tracks, request_id)
+    return encode_stream_events(events, stream_format)
+
+
+def score_candidates(tracks, candidate_lists):
+    """对每条音轨的候选整批打分，返回每条音轨的 (最佳候选下标, 置信度, 分项得分)；无候选为 None
+
+    tracks 与 candidate_lists 一一对应，候选为 SongItem；所有 (音轨, 候选) 对拼成矩阵一次计算
+    """
+    pair_track, local_rows, candidate_rows = [], [], []
+    for track_index, (track, candidates) in enumerate(zip(tracks, candidate_lists)):
+        local = _match_fields(track.title, track.artist, track.duration)
+        for candidate in candidates:
+            pair_track.append(track_index)
+            local_rows.append(local)
+            duration = _parse_duration(candidate.duration)
+            candidate_rows.append(_match_fields(candidate.songName, candidate.singer, duration))
+
+    best = [None] * len(tracks)
+    if not pair_track:
+        return best
+
+    local_columns = list(zip(*local_rows))
+    candidate_columns = list(zip(*candidate_rows))
+    clean_title = _similarity(local_columns[0], candidate_columns[0])
+    raw_title = _similarity(local_columns[1], candidate_columns[1])
+    title = CLEAN_TITLE_WEIGHT * clean_title + (1 - CLEAN_TITLE_WEIGHT) * raw_title
+    artist = _similarity(local_columns[2], candidate_columns[2])
+
+    local_duration = np.asarray(local_columns[3], dtype=np.float32)
+    candidate_duration = np.asarray(candidate_columns[3], dtype=np.float32)
+    excess = np.maximum(np.abs(local_duration - candidate_duration) - DURATION_GRACE_SECONDS, 0)
+    duration = np.exp(-excess / DURATION_DECAY_SECONDS)
+
+    weights = np.tile(np.asarray(SCORE_WEIGHTS, dtype=np.float32), (len(pair_track), 1))
+    weights[:, 1] *= np.asarray([bool(text) for text in local_columns[2]])
+    weights[:, 2] *= (local_duration > 0) & (candidate_duration > 0)
+    parts = np.stack([title, artist, duration], axis=1)
+    confidence = (parts * weights).sum(axis=1) / weights.sum(axis=1)
+
+    pair_track = np.asarray(pair_track)
+    starts = np.flatnonzero(np.r_[True, pair_track[1:] != pair_track[:-1]])
+    ends = np.r_[starts[1:], len(pair_track)]
+    for start, end in zip(starts, ends):
+        offset = int(np.argmax(confidence[start:end]))
+        pair = start + offset
+        best[pair_track[start]] = (
+            offset,
+            float(confidence[pair]),
+            {"title": float(title[pair]), "artist": float(artist[pair]), "duration": float(duration[pair])},
+        )
+    return best
+
+
+def normalize_title(title):
+    """全半角统一、小写，去掉括号内容与 feat. 段及标点；去掉后为空时保留括号内文字"""
+    text = _fold(title)
+    cleaned = _NON_WORD.sub(" ", _FEAT.sub(" ", _BRACKETED.sub(" ", text))).split()
+    return " ".join(cleaned or _NON_WORD.sub(" ", text).split())
+
+
+def normalize_artists(artist):
+    """拆分多位歌手（/ & , 、 feat. 等），各自去标点后排序，使顺序与分隔符不影响比较"""
+    names = (_NON_WORD.sub("", name) for name in _split_artists(artist))
+    return " ".join(sorted(name for name in names if name))
+
+
+"""辅助函数"""
+
+
+async def _iter_match_events(tracks, request_id):
+    """分块处理：当前块打分推送时下一块的候选搜索已在进行"""
+    throttle = KeywordSearchThrottle()
+    semaphore = asyncio.Semaphore(settings.batch_search_concurrency)
+    chunks = [tracks[i : i + MATCH_CHUNK_SIZE] for i in range(0, len(tracks), MATCH_CHUNK_SIZE)]
+
+    async def search_chunk(chunk):
+        return await asyncio.gather(
+            *(_search_candidates(track, throttle, semaphore, request_id) for track in chunk),
+            return_exceptions=True,
+        )
+
+    matched = 0
+    failed = 0
+    next_search = asyncio.create_task(search_chunk(chunks[0]))
+    try:
+        for chunk_index, chunk in enumerate(chunks):
+            results = await next_search
+            if chunk_index + 1 < len(chunks):
+                next_search = asyncio.create_task(search_chunk(chunks[chunk_index + 1]))
+
+            candidate_lists = [result if isinstance(result, list) else [] for result in results]
+            best = await asyncio.to_thread(score_candidates, chunk, candidate_lists)
+
+            base = chunk_index * MATCH_CHUNK_SIZE
+            for offset, (result, candidates, scored) in enumerate(zip(results, candidate_lists, best)):
+                if isinstance(result, BaseException):
+                    failed += 1
+                    yield _error_event(base + offset, result)
+                    continue
+                event = {"event": "match", "index": base + offset, "matched": False, "confidence": 0.0}
+                if scored is not None:
+                    position, confidence, parts = scored
+                    song = candidates[position]
+                    event.update(
+                        matched=confidence >= MATCH_THRESHOLD,
+                        confidence=round(confidence, 3),
+                        songMid=song.songMid,
+                        songId=song.songId,
+                        scores={name: round(value, 3) for name, value in parts.items()},
+                        song=song.model_dump(),
+                    )
+                matched += event["matched"]
+                yield event
+        yield {"event": "done", "total": len(tracks), "matched": matched, "failed": failed}
+    finally:
+        # 客户端断开时停止预先发起的搜索
+        next_search.cancel()
+        with suppress(asyncio.CancelledError, Exception):
+            await next_search
+
+
+async def _search_candidates(track, throttle, semaphore, request_id):
+    """以“标题 主歌手”搜索候选，无结果时退回只用标题搜索"""
+    title = normalize_title(track.title)
+    artists = _split_artists(track.artist)
+    queries = [f"{title} {artists[0]}", title] if artists else [title]
+    async with semaphore:
+        for query in queries:
+            result = await throttle.search(query, MATCH_CANDIDATES, request_id)
+            if result.result:
+                return result.result
+    return []
+
+
+def _error_event(index, exc):
+    if isinstance(exc, ServiceException):
+        return {"event": "error", "index": index, "code": exc.code, "message": exc.message}
+    logger.error(f"本地音轨匹配异常: index={index}", exc_info=exc)
+    return {"event": "error", "index": index, "message": "服务调用失败，请稍后重试"}
+
+
+def _fold(text):
+    return unicodedata.normalize("NFKC", text or "").casefold()
+
+
+def _split_artists(artist):
+    return [name for name in _ARTIST_SEPARATORS.split(_fold(artist).strip()) if name.strip()]
+
+
+@lru_cache(maxsize=16384)
+def _match_fields(title, artist, duration):
+    """比较用字段：(去括号标题, 原标题, 归一化歌手, 时长秒)"""
+    return (
+        normalize_title(title),
+        " ".join(_NON_WORD.sub(" ", _fold(title)).split()),
+        normalize_artists(artist),
+        float(duration or 0),
+    )
+
+
+def _parse_duration(text):
+    """mm:ss → 秒，无法解析返回 0"""
+    minutes, _, seconds = (text or "").partition(":")
+    try:
+        return int(minutes) * 60 + int(seconds)
+    except ValueError:
+        return 0
+
+
+def _gram_vectors(texts):
+    """字符二元组哈希到定长向量并 L2 归一化；相同文本只计算一次，所有 (行, 桶) 一次性计数"""
+    unique, inverse = np.unique(np.asarray(texts, dtype=object), return_inverse=True)
+    flat = [row * FEATURE_DIM + bucket for row, text in enumerate(unique) for bucket in _gram_buckets(text)]
+    counts = np.bincount(np.asarray(flat, dtype=np.intp), minlength=len(unique) * FEATURE_DIM)
+    matrix = counts.reshape(len(unique), FEATURE_DIM).astype(np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return (matrix / np.where(norms == 0, 1, norms))[inverse.reshape(-1)]
+
+
+@lru_cache(maxsize=65536)
+def _gram_buckets(text):
+    if not text:
+        return ()
+    padded = f" {text} "
+    return tuple(hash(padded[i : i + 2]) % FEATURE_DIM for i in range(len(padded) - 1))
+
+
+def _similarity(left_texts, right_texts):
+    """逐对余弦相似度；任一侧为空文本时为 0"""
+    return np.einsum("ij,ij->i", _gram_vectors(left_texts), _gram_vectors(right_texts))
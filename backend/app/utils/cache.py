@@ -0,0 +1,63 @@
+"""进程内 LRU + TTL 缓存"""
+import time
+from collections import OrderedDict
+from collections.abc import Hashable
+from typing import Any
+
+
+class TTLCache:
+    """容量有界的 LRU 缓存，条目按绝对过期时间失效（仅在事件循环内使用，非线程安全）"""
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, min_ttl: float = 0) -> Any | None:
+        """读取未过期条目并刷新 LRU 顺序；剩余有效期不足 min_ttl 秒视为未命中"""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        now = time.time()
+        if expires_at <= now:
+            del self._data[key]
+            self.misses += 1
+            return None
+        if expires_at - now < min_ttl:
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def __contains__(self, key: Hashable) -> bool:
+        """是否存在未过期条目（不计入命中统计，不刷新 LRU 顺序）"""
+        entry = self._data.get(key)
+        return entry is not None and entry[0] > time.time()
+
+    def set(self, key: Hashable, value: Any, expires_at: float | None = None) -> None:
+        """写入条目；未指定过期时间时使用默认 TTL，超出容量淘汰最久未使用条目"""
+        if expires_at is None:
+            expires_at = time.time() + self.ttl_seconds
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._data)}
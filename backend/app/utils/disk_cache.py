@@ -0,0 +1,89 @@
+"""容量有界的磁盘文件缓存（LRU 淘汰）"""
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+
+class DiskLRUStore:
+    """按相对路径读写 root 下的缓存文件，总容量超限时按最近使用时间淘汰单个文件
+
+    纳入容量统计的文件由 pattern（相对 root 的 glob）限定；文件 mtime 记录最近使用时间，首次使用时据此恢复 LRU 顺序
+    """
+
+    def __init__(self, root: Path, max_bytes: int, pattern: str):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.pattern = pattern
+        self._lock = threading.Lock()
+        self._index: OrderedDict[Path, int] | None = None
+        self._total_bytes = 0
+
+    def exists(self, relative: str) -> bool:
+        return (self.root / relative).exists()
+
+    def read(self, relative: str) -> bytes | None:
+        path = self.root / relative
+        try:
+            data = path.read_bytes()
+        except OSError:
+            return None
+        with self._lock:
+            index_map = self._ensure_index()
+            if path in index_map:
+                index_map.move_to_end(path)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def write(self, relative: str, data: bytes) -> None:
+        """经按线程区分的临时文件原子替换（同一文件可能被并发写入），写入后淘汰最久未用的文件直到不超容量"""
+        path = self.root / relative
+        os.makedirs(path.parent, exist_ok=True)
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        with open(tmp_path, "wb") as file:
+            file.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            index_map = self._ensure_index()
+            self._total_bytes -= index_map.pop(path, 0)
+            index_map[path] = len(data)
+            self._total_bytes += len(data)
+            while self._total_bytes > self.max_bytes and len(index_map) > 1:
+                evicted, size = index_map.popitem(last=False)
+                self._total_bytes -= size
+                try:
+                    evicted.unlink()
+                except OSError:
+                    pass
+
+    def remove_dir(self, relative: str) -> None:
+        """删除目录下的全部文件（含未纳入容量统计的文件）"""
+        directory = self.root / relative
+        with self._lock:
+            index_map = self._ensure_index()
+            for path in [path for path in index_map if path.parent == directory]:
+                self._total_bytes -= index_map.pop(path)
+        for path in directory.glob("*"):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    def _ensure_index(self) -> OrderedDict[Path, int]:
+        """首次使用时扫描磁盘，按 mtime 由旧到新建立 LRU 索引（需持锁调用）"""
+        if self._index is None:
+            entries = []
+            for path in self.root.glob(self.pattern):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, path, stat.st_size))
+            entries.sort()
+            self._index = OrderedDict((path, size) for _, path, size in entries)
+            self._total_bytes = sum(size for _, _, size in entries)
+        return self._index
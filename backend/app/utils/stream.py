@@ -0,0 +1,23 @@
+"""流式接口的事件编码与响应封装（NDJSON / SSE）"""
+import json
+
+from fastapi.responses import StreamingResponse
+
+
+async def encode_stream_events(events, stream_format):
+    """把事件编码为 NDJSON 行或 SSE 帧"""
+    async for event in events:
+        payload = json.dumps(event, ensure_ascii=False)
+        if stream_format == "sse":
+            yield f"event: {event['event']}\ndata: {payload}\n\n".encode()
+        else:
+            yield f"{payload}\n".encode()
+
+
+def event_stream_response(body, stream_format):
+    """把已编码的事件字节流包装为 NDJSON 或 SSE 流式响应（禁用缓存与反向代理缓冲）"""
+    return StreamingResponse(
+        body,
+        media_type="text/event-stream" if stream_format == "sse" else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
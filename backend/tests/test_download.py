@@ -0,0 +1,60 @@
+"""后台下载：探测响应异常时的总长判定"""
+import asyncio
+import re
+
+import httpx
+
+from app.schemas.download import DownloadTaskItem
+from app.schemas.qqmusic import SongDownloadBundleResponse, SongUrlInfo
+from app.services import download as services_download
+
+SONG_URL = "http://cdn.example.com/song.flac"
+BODY = bytes(range(256)) * (3_000_000 // 256) + b"x" * (3_000_000 % 256)
+
+
+def _unparsable_range_cdn(request: httpx.Request) -> httpx.Response:
+    """Range 请求返回无法解析的 Content-Range（总长为 *），普通请求返回完整文件"""
+    match = re.match(r"bytes=(\d+)-", request.headers.get("range", ""))
+    if match is None:
+        return httpx.Response(200, content=BODY)
+    start = int(match.group(1))
+    return httpx.Response(206, headers={"Content-Range": f"bytes {start}-{start}/*"}, content=BODY[start : start + 1])
+
+
+def test_unparsable_content_range_downloads_full_file(tmp_path, monkeypatch):
+    client = httpx.AsyncClient(transport=httpx.MockTransport(_unparsable_range_cdn))
+
+    async def get_song_download_bundle(song_mid, request_id=""):
+        return SongDownloadBundleResponse(
+            songMid=song_mid, songName="晴天", singer="周杰伦", songUrl=SongUrlInfo(url=SONG_URL, urlType="flac")
+        )
+
+    async def ensure_credential_fresh():
+        return None
+
+    monkeypatch.setattr(services_download, "get_media_client", lambda: client)
+    monkeypatch.setattr(services_download, "get_song_download_bundle", get_song_download_bundle)
+    monkeypatch.setattr(services_download.services_auth, "ensure_credential_fresh", ensure_credential_fresh)
+
+    async def run():
+        manager = services_download.DownloadManager(tmp_path / "jobs.json")
+        runner = asyncio.create_task(manager.run())
+        try:
+            job_id = manager.submit([DownloadTaskItem(songMid="001", targetDir=str(tmp_path / "out"))]).jobs[0].jobId
+            for _ in range(500):
+                job = manager._jobs[job_id]
+                if job.status in ("completed", "failed"):
+                    return job
+                await asyncio.sleep(0.01)
+            raise AssertionError(f"下载未结束: status={manager._jobs[job_id].status}")
+        finally:
+            runner.cancel()
+            await asyncio.gather(runner, return_exceptions=True)
+            await client.aclose()
+
+    job = asyncio.run(run())
+
+    assert job.status == "completed", job.error
+    assert job.totalBytes == len(BODY)
+    with open(job.filePath, "rb") as file:
+        assert file.read() == BODY